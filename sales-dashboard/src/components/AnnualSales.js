@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import axios from 'axios';
-import { Bar, Line } from 'react-chartjs-2';
+import { Bar, Line, Pie } from 'react-chartjs-2';
 import Chart from 'chart.js/auto';
 import ChartDataLabels from 'chartjs-plugin-datalabels';
 
@@ -27,11 +27,11 @@ const AnnualSales = () => {
 
             // Fetch sales by products (bar chart)
             const salesByProductsRes = await axios.get(`http://localhost:8000/sales/annual/by-products/?selected_year=${selectedYear}`);
-            setSalesByProductsChart(salesByProductsRes.data.sales_by_products_chart);
+            setSalesByProductsChart(salesByProductsRes.data.sales_by_products_chart_data);
 
             // Fetch quantity pie chart
             const quantitySalesPieRes = await axios.get(`http://localhost:8000/sales/annual/quantity-pie/?selected_year=${selectedYear}`);
-            setQuantitySalesPieChart(quantitySalesPieRes.data.quantity_sales_pie_chart);
+            setQuantitySalesPieChart(quantitySalesPieRes.data.quantity_sales_pie_chart_data);
 
             // Fetch sales comparison text and chart
             const salesComparisonRes = await axios.get(`http://localhost:8000/sales/annual/comparison/?selected_year=${selectedYear}`);
@@ -76,14 +76,14 @@ const AnnualSales = () => {
             {salesByProductsChart && (
                 <div>
                     <h2>Sales by Products</h2>
-                    <img src={`data:image/png;base64,${salesByProductsChart}`} alt="Sales by Products Chart" />
+                    <Bar data={salesByProductsChart} />
                 </div>
             )}
 
             {quantitySalesPieChart && (
                 <div>
                     <h2>Quantity Sales Pie Chart</h2>
-                    <img src={`data:image/png;base64,${quantitySalesPieChart}`} alt="Quantity Sales Pie Chart" />
+                    <Pie data={quantitySalesPieChart} />
                 </div>
             )}
 
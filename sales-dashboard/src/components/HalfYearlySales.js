@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import axios from 'axios';
-import { Bar, Line } from 'react-chartjs-2';
+import { Bar, Line, Pie } from 'react-chartjs-2';
 import Chart from 'chart.js/auto';
 import ChartDataLabels from 'chartjs-plugin-datalabels';
 
@@ -25,11 +25,11 @@ const HalfYearlySales = () => {
 
             // Fetch sales by products
             const salesByProductsRes = await axios.get(`http://localhost:8000/sales/halfyearly/by-products/?selected_halfyear=${selectedHalfYear}`);
-            setSalesByProductsChart(salesByProductsRes.data.sales_by_products_chart);
+            setSalesByProductsChart(salesByProductsRes.data.sales_by_products_chart_data);
 
             // Fetch quantity sales pie chart
             const quantitySalesPieRes = await axios.get(`http://localhost:8000/sales/halfyearly/quantity-pie/?selected_halfyear=${selectedHalfYear}`);
-            setQuantitySalesPieChart(quantitySalesPieRes.data.quantity_sales_pie_chart);
+            setQuantitySalesPieChart(quantitySalesPieRes.data.quantity_sales_pie_chart_data);
 
             // Fetch comparison text
             const comparisonRes = await axios.get(`http://localhost:8000/sales/halfyearly/comparison/?selected_halfyear=${selectedHalfYear}`);
@@ -72,14 +72,14 @@ const HalfYearlySales = () => {
             {salesByProductsChart && (
                 <div>
                     <h2>Sales by Products</h2>
-                    <img src={`data:image/png;base64,${salesByProductsChart}`} alt="Sales by Products Chart" />
+                    <Bar data={salesByProductsChart} />
                 </div>
             )}
 
             {quantitySalesPieChart && (
                 <div>
                     <h2>Quantity Sales Pie Chart</h2>
-                    <img src={`data:image/png;base64,${quantitySalesPieChart}`} alt="Quantity Sales Pie Chart" />
+                    <Pie data={quantitySalesPieChart} />
                 </div>
             )}
 
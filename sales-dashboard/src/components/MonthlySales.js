@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import axios from 'axios';
 import { Container, Row, Col, Form, Button, Card } from 'react-bootstrap';
-import { Bar } from 'react-chartjs-2';
+import { Bar, Line, Pie } from 'react-chartjs-2';
 import 'bootstrap/dist/css/bootstrap.min.css';
 import '../App.css'; // Adjust path if needed
 import {
@@ -9,6 +9,9 @@ import {
   CategoryScale,
   LinearScale,
   BarElement,
+  ArcElement,
+  PointElement,
+  LineElement,
   Title,
   Tooltip,
   Legend,
@@ -19,6 +22,9 @@ ChartJS.register(
   CategoryScale,
   LinearScale,
   BarElement,
+  ArcElement,
+  PointElement,
+  LineElement,
   Title,
   Tooltip,
   Legend
@@ -27,8 +33,8 @@ ChartJS.register(
 const MonthlySales = () => {
   const [selectedMonth, setSelectedMonth] = useState('');
   const [totalSales, setTotalSales] = useState(null);
-  const [byProductsChart, setByProductsChart] = useState('');
-  const [quantityPieChart, setQuantityPieChart] = useState('');
+  const [byProductsChart, setByProductsChart] = useState(null);
+  const [quantityPieChart, setQuantityPieChart] = useState(null);
   const [weeklySalesChart, setWeeklySalesChart] = useState(null); 
   const [salesComparison, setSalesComparison] = useState('');
   const [comparisonChartData, setComparisonChartData] = useState(null);
@@ -52,21 +58,21 @@ const MonthlySales = () => {
         `http://localhost:8000/sales/by-products/?selected_month=${selectedMonth}`
       );
       console.log("By Products Chart Response:", byProductsResponse.data);
-      setByProductsChart(byProductsResponse.data.sales_by_products_chart);
+      setByProductsChart(byProductsResponse.data.sales_by_products_chart_data);
   
       // Fetch quantity pie chart
       const quantityPieResponse = await axios.get(
         `http://localhost:8000/sales/quantity-pie/?selected_month=${selectedMonth}`
       );
       console.log("Quantity Pie Chart Response:", quantityPieResponse.data);
-      setQuantityPieChart(quantityPieResponse.data.quantity_sales_pie_chart);
+      setQuantityPieChart(quantityPieResponse.data.quantity_sales_pie_chart_data);
   
       // Fetch weekly sales chart
       const weeklySalesResponse = await axios.get(
         `http://localhost:8000/sales/weekly/?selected_month=${selectedMonth}`
       );
       console.log("Weekly Sales Response:", weeklySalesResponse.data);
-      setWeeklySalesChart(weeklySalesResponse.data.weekly_sales_chart);
+      setWeeklySalesChart(weeklySalesResponse.data.weekly_sales_chart_data);
 
       // Fetch sales comparison
       const comparisonResponse = await axios.get(`http://localhost:8000/sales/comparison/?selected_month=${selectedMonth}`);
@@ -148,11 +154,7 @@ const MonthlySales = () => {
             <Card.Body>
               <h4>Sales by Products</h4>
               {byProductsChart ? (
-                <img
-                  src={`data:image/png;base64,${byProductsChart}`}
-                  alt="Sales by Products"
-                  className="chart-img"
-                />
+                <Bar data={byProductsChart} />
               ) : (
                 <p>No chart available</p>
               )}
@@ -165,11 +167,7 @@ const MonthlySales = () => {
             <Card.Body>
               <h4>Quantity Pie Chart</h4>
               {quantityPieChart ? (
-                <img
-                  src={`data:image/png;base64,${quantityPieChart}`}
-                  alt="Quantity Pie Chart"
-                  className="chart-img"
-                />
+                <Pie data={quantityPieChart} />
               ) : (
                 <p>No chart available</p>
               )}
@@ -185,11 +183,7 @@ const MonthlySales = () => {
             <Card.Body>
               <h4>Weekly Sales</h4>
               {weeklySalesChart ? (
-                <img
-                  src={`data:image/png;base64,${weeklySalesChart}`}
-                  alt="Weekly Sales Chart"
-                  className="chart-img"
-                />
+                <Line data={weeklySalesChart} />
               ) : (
                 <p>No chart available</p>
               )}
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import axios from 'axios';
-import { Bar, Line } from 'react-chartjs-2';
+import { Bar, Line, Pie } from 'react-chartjs-2';
 import Chart from 'chart.js/auto';
 import ChartDataLabels from 'chartjs-plugin-datalabels';
 
@@ -25,11 +25,11 @@ const QuarterlySales = () => {
     
             // Fetch sales by products (bar chart)
             const salesByProductsRes = await axios.get(`http://localhost:8000/sales/quarterly/by-products/?selected_quarter=${selectedQuarter}`);
-            setSalesByProductsChart(salesByProductsRes.data.sales_by_products_chart);
+            setSalesByProductsChart(salesByProductsRes.data.sales_by_products_chart_data);
     
             // Fetch quantity pie chart
             const quantitySalesPieRes = await axios.get(`http://localhost:8000/sales/quarterly/quantity-pie/?selected_quarter=${selectedQuarter}`);
-            setQuantitySalesPieChart(quantitySalesPieRes.data.quantity_sales_pie_chart);
+            setQuantitySalesPieChart(quantitySalesPieRes.data.quantity_sales_pie_chart_data);
     
             // Fetch quarterly sales comparison text (removed the bar chart part)
             const comparisonRes = await axios.get(`http://localhost:8000/sales/quarterly/comparison/?selected_quarter=${selectedQuarter}`);
@@ -75,14 +75,14 @@ const QuarterlySales = () => {
             {salesByProductsChart && (
                 <div>
                     <h2>Sales by Products</h2>
-                    <img src={`data:image/png;base64,${salesByProductsChart}`} alt="Sales by Products Chart" />
+                    <Bar data={salesByProductsChart} />
                 </div>
             )}
 
             {quantitySalesPieChart && (
                 <div>
                     <h2>Quantity Sales Pie Chart</h2>
-                    <img src={`data:image/png;base64,${quantitySalesPieChart}`} alt="Quantity Sales Pie Chart" />
+                    <Pie data={quantitySalesPieChart} />
                 </div>
             )}
 
@@ -0,0 +1,130 @@
+import contextlib
+import functools
+import math
+import os
+import threading
+import time
+from fastapi import HTTPException
+import metrics
+
+# Concurrent computations and queued requests allowed per route class. Queued requests
+# hold a worker thread, so both budgets together should stay well below the threadpool
+# size (40 threads by default) to leave room for cache hits and other routes.
+LIGHT_LIMIT = int(os.environ.get('ADMISSION_LIGHT_LIMIT', '16'))
+LIGHT_QUEUE = int(os.environ.get('ADMISSION_LIGHT_QUEUE', '8'))
+RENDER_LIMIT = int(os.environ.get('ADMISSION_RENDER_LIMIT', '2'))
+RENDER_QUEUE = int(os.environ.get('ADMISSION_RENDER_QUEUE', '8'))
+# Seconds a queued request waits for a free slot before it is shed
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '10'))
+
+
+# Raised instead of queueing a background call when the gate has no spare capacity
+class GateBusy(Exception):
+    pass
+
+
+# At most `limit` calls run at once; up to `queue_size` more wait for a slot and any
+# further call is rejected immediately with 503 and a Retry-After estimate.
+class AdmissionGate:
+    def __init__(self, name, limit, queue_size):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self._condition = threading.Condition()
+        self._running = 0
+        self._waiting = 0
+        # Moving average of the time one admitted call takes, in seconds
+        self._service_time = 0.0
+
+    def _report(self):
+        metrics.set_gauge(f"admission.{self.name}.in_flight", self._running)
+        metrics.set_gauge(f"admission.{self.name}.queue_depth", self._waiting)
+
+    def _reject(self, reason):
+        metrics.incr(f"admission.{self.name}.{reason}")
+        # Time for the calls ahead of a retry to drain through the available slots
+        retry_after = max(1, math.ceil(self._service_time * (self._waiting + 1) / self.limit))
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is busy with {self.name} requests, please retry later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    # Background calls (cache warming) never queue and leave one slot free for live
+    # requests (with a single slot they only run when the gate is idle)
+    @contextlib.contextmanager
+    def slot(self, timeout=QUEUE_TIMEOUT, background=False):
+        with self._condition:
+            if background and (self._waiting or self._running >= max(self.limit - 1, 1)):
+                metrics.incr(f"admission.{self.name}.background_skipped")
+                raise GateBusy(f"No spare {self.name} capacity for background work")
+            if self._running >= self.limit:
+                if self._waiting >= self.queue_size:
+                    self._reject("rejected")
+                self._waiting += 1
+                self._report()
+                deadline = time.monotonic() + timeout
+                try:
+                    while self._running >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject("timeouts")
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._running += 1
+            self._report()
+
+        metrics.incr(f"admission.{self.name}.admitted")
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._condition:
+                self._running -= 1
+                self._service_time = elapsed if not self._service_time else 0.8 * self._service_time + 0.2 * elapsed
+                self._report()
+                self._condition.notify()
+
+    # A request waiting for an identical in-progress computation holds a worker thread
+    # just like a queued one, so it takes a queue position and is shed when none is free
+    @contextlib.contextmanager
+    def queued(self):
+        with self._condition:
+            if self._waiting >= self.queue_size:
+                self._reject("rejected")
+            self._waiting += 1
+            self._report()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._waiting -= 1
+                self._report()
+
+
+# Cheap numeric and chart data routes, and Matplotlib chart rendering
+light = AdmissionGate('light', LIGHT_LIMIT, LIGHT_QUEUE)
+render = AdmissionGate('render', RENDER_LIMIT, RENDER_QUEUE)
+
+
+# Gate of a chart endpoint call: a PNG takes the 'render' budget, Chart.js data (a few
+# prefix-sum or daily-series lookups) is as cheap as the numeric routes
+def by_chart_format(kwargs):
+    return render if kwargs.get('chart_format') == 'png' else light
+
+
+# A route's gate is either an AdmissionGate or a function picking one from the call's arguments
+def gate_for(gate, kwargs):
+    return gate if isinstance(gate, AdmissionGate) else gate(kwargs)
+
+
+# Run every call of a (synchronous) endpoint through `gate`
+def limited(endpoint, gate, background=False):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with gate_for(gate, kwargs).slot(background=background):
+            return endpoint(*args, **kwargs)
+
+    return wrapper
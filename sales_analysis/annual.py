@@ -1,11 +1,16 @@
+from typing import Optional
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
-from pymongo import MongoClient
+from dataset import period_sums, period_daily
+from charts import (
+    CHART_FORMAT_PATTERN,
+    bar_chart_data,
+    pie_chart_data,
+    line_chart_data,
+    render_bar_chart,
+    render_pie_chart,
+    render_line_chart,
+)
 
 app = FastAPI()
 
@@ -18,36 +23,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB setup
-client = MongoClient("mongodb://localhost:27017/")
-db = client['Sales']
-collection = db['Sales_data']
-
-# Helper function to fetch and prepare data from MongoDB
-def fetch_and_prepare_data():
-    all_documents = collection.find()
-    data_list = list(all_documents)
-    df = pd.DataFrame(data_list)
-
-    df.drop(['_id'], axis=1, inplace=True)
-    df['Date'] = pd.to_datetime(df['Date'], format='%d-%m-%Y', errors='coerce')
-    
-    df.dropna(subset=['Date'], inplace=True)
-    return df
-
 @app.get("/sales/annual/total/")
-async def annual_total_sales(selected_year: str = Query(..., regex=r"^\d{4}$")):
+def annual_total_sales(
+    selected_year: str = Query(..., regex=r"^\d{4}$"),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        start_date = pd.Timestamp(f'{selected_year}-01-01')
-        end_date = pd.Timestamp(f'{selected_year}-12-31')
+        # Look up the prefix-sum totals of the selected year
+        annual_sums = period_sums(selected_year, 'annual', store)
 
-        annual_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-
-        if annual_data.empty:
+        if not annual_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected year.")
 
-        total_sales = annual_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales = annual_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
         return {"total_sales": total_sales}
 
@@ -55,30 +43,24 @@ async def annual_total_sales(selected_year: str = Query(..., regex=r"^\d{4}$")):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/annual/by-products/")
-async def annual_sales_by_products(selected_year: str = Query(..., regex=r"^\d{4}$")):
+def annual_sales_by_products(
+    selected_year: str = Query(..., regex=r"^\d{4}$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        start_date = pd.Timestamp(f'{selected_year}-01-01')
-        end_date = pd.Timestamp(f'{selected_year}-12-31')
+        # Look up the prefix-sum totals of the selected year
+        annual_sums = period_sums(selected_year, 'annual', store)
 
-        annual_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-
-        if annual_data.empty:
+        if not annual_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected year.")
 
-        product_sales = annual_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
+        product_sales = annual_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']]
 
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x=product_sales.index, y=product_sales.values, palette='Blues_d')
-        plt.title(f'Sales Distribution by Products in {selected_year}')
-        plt.xlabel('Product Categories')
-        plt.ylabel('Total Sales')
+        if chart_format == 'data':
+            return {"sales_by_products_chart_data": bar_chart_data(product_sales, 'Total Sales')}
 
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        img_base64 = render_bar_chart(product_sales, f'Sales Distribution by Products in {selected_year}')
 
         return {"sales_by_products_chart": img_base64}
 
@@ -86,28 +68,24 @@ async def annual_sales_by_products(selected_year: str = Query(..., regex=r"^\d{4
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/annual/quantity-pie/")
-async def annual_quantity_pie_chart(selected_year: str = Query(..., regex=r"^\d{4}$")):
+def annual_quantity_pie_chart(
+    selected_year: str = Query(..., regex=r"^\d{4}$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        start_date = pd.Timestamp(f'{selected_year}-01-01')
-        end_date = pd.Timestamp(f'{selected_year}-12-31')
+        # Look up the prefix-sum totals of the selected year
+        annual_sums = period_sums(selected_year, 'annual', store)
 
-        annual_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-
-        if annual_data.empty:
+        if not annual_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected year.")
 
-        quantities = annual_data[['Q-P1', 'Q-P2', 'Q-P3', 'Q-P4']].sum()
+        quantities = annual_sums[['Q-P1', 'Q-P2', 'Q-P3', 'Q-P4']]
 
-        plt.figure(figsize=(8, 8))
-        plt.pie(quantities, labels=quantities.index, autopct='%1.1f%%', colors=sns.color_palette('pastel'))
-        plt.title(f'Quantity Sales Distribution for {selected_year}')
+        if chart_format == 'data':
+            return {"quantity_sales_pie_chart_data": pie_chart_data(quantities, 'Quantity')}
 
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        img_base64 = render_pie_chart(quantities, f'Quantity Sales Distribution for {selected_year}')
 
         return {"quantity_sales_pie_chart": img_base64}
 
@@ -115,26 +93,25 @@ async def annual_quantity_pie_chart(selected_year: str = Query(..., regex=r"^\d{
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/annual/comparison/")
-async def annual_sales_comparison(selected_year: str = Query(..., regex=r"^\d{4}$")):
+def annual_sales_comparison(
+    selected_year: str = Query(..., regex=r"^\d{4}$"),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        start_date = pd.Timestamp(f'{selected_year}-01-01')
-        end_date = pd.Timestamp(f'{selected_year}-12-31')
         prev_year = str(int(selected_year) - 1)
-        prev_start_date = pd.Timestamp(f'{prev_year}-01-01')
-        prev_end_date = pd.Timestamp(f'{prev_year}-12-31')
 
-        annual_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-        if annual_data.empty:
+        # Look up the prefix-sum totals of the selected and previous year
+        annual_sums = period_sums(selected_year, 'annual', store)
+        if not annual_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected year.")
 
-        total_sales_selected_year = annual_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales_selected_year = annual_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
-        previous_year_data = df[(df['Date'] >= prev_start_date) & (df['Date'] <= prev_end_date)]
-        if previous_year_data.empty:
+        previous_year_sums = period_sums(prev_year, 'annual', store)
+        if not previous_year_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the previous year.")
 
-        total_sales_previous_year = previous_year_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales_previous_year = previous_year_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
         percentage_change = 0
         if total_sales_previous_year > 0:
@@ -163,19 +140,20 @@ async def annual_sales_comparison(selected_year: str = Query(..., regex=r"^\d{4}
 
 
 @app.get("/sales/annual/monthly-comparison/")
-async def annual_monthly_comparison(selected_year: str = Query(..., regex=r"^\d{4}$")):
+def annual_monthly_comparison(
+    selected_year: str = Query(..., regex=r"^\d{4}$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        start_date = pd.Timestamp(f'{selected_year}-01-01')
-        end_date = pd.Timestamp(f'{selected_year}-12-31')
-
-        annual_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
+        # Daily totals of the selected year
+        annual_data = period_daily(selected_year, 'annual', store)
         if annual_data.empty:
             raise HTTPException(status_code=404, detail="No data found for the selected year.")
 
         # Aggregate monthly sales
-        annual_data['Month'] = annual_data['Date'].dt.to_period('M')
-        monthly_sales = annual_data.groupby('Month')[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
+        months = annual_data.index.to_period('M').rename('Month')
+        monthly_sales = annual_data.groupby(months)[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
         monthly_sales['Total'] = monthly_sales.sum(axis=1)
 
         # Prepare the data for JSON response
@@ -190,25 +168,17 @@ async def annual_monthly_comparison(selected_year: str = Query(..., regex=r"^\d{
             }
         }
 
+        if chart_format == 'data':
+            return {
+                "chart_data": monthly_sales_json,
+                "monthly_sales_chart_data": line_chart_data(monthly_sales_json['months'], monthly_sales['Total'], 'Total Sales'),
+            }
+
         # Create monthly sales comparison chart
-        plt.figure(figsize=(12, 6))
-        plt.plot(monthly_sales.index.astype(str), monthly_sales['Total'], marker='o', color='skyblue', linestyle='-', label='Total Sales')
-        plt.title(f'Monthly Sales Comparison in {selected_year}')
-        plt.xlabel('Month')
-        plt.ylabel('Total Sales')
-        plt.xticks(rotation=45)
-        plt.grid(True)
-
-        for i, value in enumerate(monthly_sales['Total']):
-            plt.text(i, value, f'{value:.2f}', ha='center', va='bottom', fontsize=9)
-        plt.legend()
-
-        # Save the plot as a base64-encoded image
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        img_base64 = render_line_chart(
+            monthly_sales.index.astype(str), monthly_sales['Total'], f'Monthly Sales Comparison in {selected_year}', 'Month', 'Total Sales',
+            value_format=lambda v: f'{v:.2f}', color='skyblue', fontsize=9, label='Total Sales'
+        )
 
         return {
             "chart_data": monthly_sales_json,
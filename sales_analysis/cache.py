@@ -0,0 +1,135 @@
+import functools
+import inspect
+import os
+import threading
+from collections import Counter, OrderedDict
+from fastapi import Request, Response
+import metrics
+from dataset import get_data_version
+from admission import limited
+from singleflight import coalesce
+from conditional import validators, not_modified
+
+# Maximum number of endpoint responses kept for the current data version
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '512'))
+
+
+# LRU cache of endpoint responses. Entries belong to one partition (store, or None for
+# all stores) and its data version; a partition's entries are dropped as soon as a
+# lookup arrives with a newer version of that partition, the others are kept.
+class ResultCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versions = {}
+
+    def _check_version(self, partition, version):
+        if self._versions.get(partition) != version:
+            for key in [key for key in self._entries if key[0] == partition]:
+                del self._entries[key]
+            self._versions[partition] = version
+
+    def get(self, partition, version, key):
+        with self._lock:
+            self._check_version(partition, version)
+            key = (partition, key)
+            if key not in self._entries:
+                metrics.incr("cache.misses")
+                return False, None
+            self._entries.move_to_end(key)
+            metrics.incr("cache.hits")
+            return True, self._entries[key]
+
+    def put(self, partition, version, key, value):
+        with self._lock:
+            self._check_version(partition, version)
+            key = (partition, key)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("cache.entries", len(self._entries))
+
+
+# Request counts per endpoint call, halved on every decay() so they track recent traffic
+class RequestStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._calls = {}
+
+    def record(self, key, endpoint, kwargs):
+        with self._lock:
+            self._counts[key] += 1
+            self._calls[key] = (endpoint, kwargs)
+
+    def top(self, k):
+        with self._lock:
+            return [self._calls[key] for key, _ in self._counts.most_common(k)]
+
+    def decay(self):
+        with self._lock:
+            for key in list(self._counts):
+                self._counts[key] //= 2
+                if not self._counts[key]:
+                    del self._counts[key]
+                    del self._calls[key]
+
+
+results = ResultCache(RESULT_CACHE_SIZE)
+request_stats = RequestStats()
+
+
+# Wrap a (synchronous) endpoint so its responses are cached per data version and
+# concurrent misses are coalesced. A `store` argument selects the partition whose
+# data version the response is cached under. Only the coalesced computation of a
+# miss passes through the admission `gate` (or the gate a function picks from the call's
+# arguments, see admission.gate_for), and identical misses waiting for it take
+# positions in the gate's queue; hits are never queued or shed.
+# Responses carry ETag/Last-Modified/Cache-Control validators, and a request whose
+# validators still match is answered with 304 before the cache is even consulted.
+# `wrapper.compute(**kwargs)` fills the cache without counting as a request, for the
+# background warmer; its misses only use spare gate capacity (see AdmissionGate.slot).
+def cached(endpoint, gate=None):
+    coalesced = coalesce(limited(endpoint, gate) if gate is not None else endpoint, gate)
+    warming = coalesce(limited(endpoint, gate, background=True) if gate is not None else endpoint, background=True)
+
+    def request_key(kwargs):
+        return (endpoint.__module__, endpoint.__name__, tuple(sorted(kwargs.items())))
+
+    def lookup(key, partition, version, kwargs, run=coalesced):
+        hit, result = results.get(partition, version, key)
+        if not hit:
+            result = run(**kwargs)
+            results.put(partition, version, key, result)
+        return result
+
+    def compute(**kwargs):
+        key = request_key(kwargs)
+        partition = kwargs.get('store')
+        return key, lookup(key, partition, get_data_version(partition), kwargs, warming)
+
+    @functools.wraps(endpoint)
+    def wrapper(request, response, **kwargs):
+        key = request_key(kwargs)
+        partition = kwargs.get('store')
+        version = get_data_version(partition)
+        headers = validators(key, partition, version, kwargs)
+        request_stats.record(key, wrapper, kwargs)
+        unchanged = not_modified(request, headers)
+        if unchanged is not None:
+            return unchanged
+        result = lookup(key, partition, version, kwargs)
+        response.headers.update(headers)
+        return result
+
+    # The endpoint's query parameters plus the request and the response headers
+    signature = inspect.signature(endpoint)
+    wrapper.__signature__ = signature.replace(parameters=[
+        inspect.Parameter('request', inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request),
+        inspect.Parameter('response', inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Response),
+        *signature.parameters.values(),
+    ])
+    wrapper.compute = compute
+    return wrapper
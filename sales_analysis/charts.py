@@ -0,0 +1,94 @@
+import threading
+from io import BytesIO
+import base64
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# pyplot keeps global figure state, so charts rendered from concurrent request
+# threads must not interleave
+plot_lock = threading.Lock()
+
+# Query parameter shared by every chart endpoint: 'data' returns Chart.js-ready
+# series and skips rendering, 'png' renders the Matplotlib image for export
+CHART_FORMAT_PATTERN = r"^(data|png)$"
+
+
+def _values(values):
+    return [float(value) for value in values]
+
+
+def _percentages(values):
+    total = float(sum(values))
+    return [round(float(value) / total * 100, 2) if total else None for value in values]
+
+
+# Chart.js data for a bar chart of one value per label (e.g. sales per product)
+def bar_chart_data(series, label):
+    return {
+        "labels": [str(index) for index in series.index],
+        "datasets": [{"label": label, "data": _values(series.values)}],
+        "percentages": _percentages(series.values),
+    }
+
+
+# Chart.js data for a pie chart; percentages match the slices' autopct labels
+def pie_chart_data(series, label):
+    return bar_chart_data(series, label)
+
+
+# Chart.js data for a line chart over ordered labels (weeks, months)
+def line_chart_data(labels, values, label):
+    return {
+        "labels": [str(item) for item in labels],
+        "datasets": [{"label": label, "data": _values(values)}],
+    }
+
+
+def _figure_to_base64():
+    buf = BytesIO()
+    plt.savefig(buf, format="png")
+    plt.close()
+    buf.seek(0)
+    return base64.b64encode(buf.read()).decode('utf-8')
+
+
+def render_bar_chart(series, title):
+    with plot_lock:
+        plt.figure(figsize=(10, 6))
+        sns.barplot(x=series.index, y=series.values, palette='Blues_d')
+        plt.title(title)
+        plt.xlabel('Product Categories')
+        plt.ylabel('Total Sales')
+        return _figure_to_base64()
+
+
+def render_pie_chart(series, title):
+    with plot_lock:
+        plt.figure(figsize=(8, 8))
+        plt.pie(series, labels=series.index, autopct='%1.1f%%', colors=sns.color_palette('pastel'))
+        plt.title(title)
+        return _figure_to_base64()
+
+
+# Line chart with every point annotated by `value_format(value)`
+def render_line_chart(labels, values, title, xlabel, ylabel, value_format, color='blue',
+                      fontsize=12, linewidth=None, label=None, tick_alignment='center'):
+    with plot_lock:
+        plt.figure(figsize=(12, 6))
+        plt.plot(labels, values, marker='o', color=color, linestyle='-', linewidth=linewidth, label=label)
+        plt.title(title)
+        plt.xlabel(xlabel)
+        plt.ylabel(ylabel)
+
+        for i, value in enumerate(values):
+            plt.text(i, value, value_format(value), ha='center', va='bottom', fontsize=fontsize)
+
+        plt.grid(True)
+        plt.xticks(rotation=45, ha=tick_alignment)
+        if label is not None:
+            plt.legend()
+        return _figure_to_base64()
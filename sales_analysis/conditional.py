@@ -0,0 +1,100 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+import pandas as pd
+from fastapi import Response
+import metrics
+from dataset import parse_period, period_bounds
+
+# Browser/CDN lifetime of responses about closed periods, which only change when
+# historical data is backfilled, and about the current, still-open period
+CLOSED_PERIOD_MAX_AGE = int(os.environ.get('CLOSED_PERIOD_MAX_AGE', '86400'))
+OPEN_PERIOD_MAX_AGE = int(os.environ.get('OPEN_PERIOD_MAX_AGE', '60'))
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+# Period query parameters of the dashboard endpoints and their granularity
+PERIOD_PARAMETERS = {
+    'selected_month': 'monthly',
+    'selected_quarter': 'quarterly',
+    'selected_halfyear': 'halfyearly',
+    'selected_year': 'annual',
+}
+
+# When each partition's current data version was first seen, for Last-Modified
+_lock = threading.Lock()
+_first_seen = {}
+
+
+def _last_modified(partition, version):
+    with _lock:
+        seen = _first_seen.get(partition)
+        if seen is None or seen[0] != version:
+            seen = _first_seen[partition] = (version, int(time.time()))
+        return seen[1]
+
+
+# Last day a request covers, or None when it cannot be told from the parameters
+def _covered_until(kwargs):
+    parameters = list(PERIOD_PARAMETERS.items())
+    # Period labels of the export and growth routes, in the request's granularity
+    parameters += [('period', kwargs.get('granularity')), ('end', kwargs.get('granularity'))]
+    try:
+        for name, granularity in parameters:
+            value = kwargs.get(name)
+            if value is None:
+                continue
+            if re.match(DATE_PATTERN, value):
+                return pd.Timestamp(value)
+            return period_bounds(parse_period(value, granularity), granularity)[1]
+    except (KeyError, ValueError):
+        pass
+    return None
+
+
+def _cache_control(kwargs):
+    until = _covered_until(kwargs)
+    if until is not None and until < pd.Timestamp.today().normalize():
+        return f"public, max-age={CLOSED_PERIOD_MAX_AGE}, immutable"
+    return f"public, max-age={OPEN_PERIOD_MAX_AGE}"
+
+
+# ETag, Last-Modified and Cache-Control of a response. Everything is derived from the
+# request key and the data version of its partition, so no data is read.
+def validators(key, partition, version, kwargs):
+    digest = hashlib.sha1(repr((key, version)).encode()).hexdigest()[:32]
+    return {
+        'ETag': f'"{digest}"',
+        'Last-Modified': formatdate(_last_modified(partition, version), usegmt=True),
+        'Cache-Control': _cache_control(kwargs),
+    }
+
+
+# Whether the client's copy is still current: If-None-Match when sent, otherwise
+# If-Modified-Since (HTTP dates have one-second resolution). 'If-None-Match: *' is not
+# honoured: the validators are known before it is known whether the request has a
+# representation at all (a period without data is a 404).
+def _client_is_current(request, headers):
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return headers['ETag'] in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers['Last-Modified']).timestamp() <= since
+    return False
+
+
+# 304 response when the request's validators match `headers`, otherwise None
+def not_modified(request, headers):
+    if request.method not in ('GET', 'HEAD') or not _client_is_current(request, headers):
+        return None
+    metrics.incr("http.not_modified")
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,476 @@
+import contextlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import numpy as np
+import pandas as pd
+import metrics
+from singleflight import SingleFlight
+from sources import (
+    SALES_COLUMNS,
+    QUANTITY_COLUMNS,
+    PARTITION_FIELD,
+    get_source,
+)
+
+# Backend selected by DATA_SOURCE (Mongo by default, or a local Parquet/CSV/SQLite file)
+source = get_source()
+
+# Number of months in one period of each granularity
+GRANULARITY_MONTHS = {
+    'monthly': 1,
+    'quarterly': 3,
+    'halfyearly': 6,
+    'annual': 12,
+}
+
+# Label formats used by the existing query parameters (2011-05, 2011-Q2, 2011-H1, 2011)
+PERIOD_LABEL_PATTERNS = {
+    'monthly': r"^\d{4}-\d{2}$",
+    'quarterly': r"^\d{4}-Q[1-4]$",
+    'halfyearly': r"^\d{4}-H[12]$",
+    'annual': r"^\d{4}$",
+}
+
+# A store of None everywhere below means all stores (see sources.PARTITION_FIELD).
+# Worker processes aggregating partitions for all-store views (1 aggregates in-process)
+PARTITION_WORKERS = int(os.environ.get('PARTITION_WORKERS', str(os.cpu_count() or 1)))
+
+
+data_flights = SingleFlight('data')
+
+
+# Helper function to fetch and prepare data from the configured source: rows with a
+# valid date, optionally restricted to a date range, a partition and a data version
+def fetch_and_prepare_data(store=None, start_date=None, end_date=None, until=None):
+    columns = [PARTITION_FIELD] + SALES_COLUMNS + QUANTITY_COLUMNS
+    frames = list(source.batches(columns, start_date, end_date, store, batch_size=STREAM_BATCH_SIZE, until=until))
+    if not frames:
+        return pd.DataFrame({'Date': pd.Series(dtype='datetime64[ns]'),
+                             **{column: pd.Series(dtype=float) for column in columns}})
+    return pd.concat(frames, ignore_index=True)
+
+
+# Seconds a data version probe is reused before the source is asked again
+DATA_VERSION_TTL = float(os.environ.get('DATA_VERSION_TTL', '1'))
+
+# Last version probe of each partition (None: all data) and when it ran
+_version_cache = {}
+
+
+# Cheap fingerprint of a partition, or of all data: changes whenever its rows are added,
+# removed or (via the source's write marker) changed, so (on Mongo and SQLite) a write
+# to one store leaves the others' versions alone
+def get_data_version(store=None):
+    now = time.monotonic()
+    cached = _version_cache.get(store)
+    if cached is None or now - cached[1] >= DATA_VERSION_TTL:
+        cached = _version_cache[store] = (source.version(store), now)
+    return cached[0]
+
+
+_versioned_cache = {}
+
+
+# Result of `build(version)` for the current data version of a partition. It is rebuilt
+# once per version change, and concurrent rebuilds share a single read of the source.
+def _cached_for_version(name, build, store=None):
+    version = get_data_version(store)
+    cached = _versioned_cache.get((name, store))
+    if cached is None or cached[0] != version:
+        cached = (version, data_flights.do((name, store, version), build, version))
+        _versioned_cache[(name, store)] = cached
+    return cached[1]
+
+
+# Partition keys present in the data
+def partitions():
+    return _cached_for_version('partitions', lambda version: source.partitions())
+
+
+# Prepared rows sorted by date, with the dates as a NumPy array so any date range
+# maps to a contiguous block of rows found by binary search. Slices are views of
+# the shared frame and must not be modified in place.
+class SortedSales:
+    def __init__(self, df):
+        self.frame = df.sort_values('Date', kind='stable', ignore_index=True)
+        self.dates = self.frame['Date'].to_numpy()
+
+    # Row offsets [lo, hi) of every row dated from start_date through the whole of end_date
+    def offsets(self, start_date, end_date):
+        lo = self.dates.searchsorted(pd.Timestamp(start_date).to_datetime64(), side='left')
+        after_end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+        hi = self.dates.searchsorted(after_end.to_datetime64(), side='left')
+        return int(lo), int(max(lo, hi))
+
+    def slice(self, start_date, end_date):
+        lo, hi = self.offsets(start_date, end_date)
+        return self.frame.iloc[lo:hi]
+
+
+def sorted_sales(store=None):
+    return _cached_for_version('sorted', lambda version: SortedSales(fetch_and_prepare_data(store, until=version)), store)
+
+
+def slice_range(start_date, end_date, store=None):
+    return sorted_sales(store).slice(start_date, end_date)
+
+
+INDEX_COLUMNS = SALES_COLUMNS + QUANTITY_COLUMNS + ['Rows']
+
+
+# Most documents pulled from the cursor per aggregation batch
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '10000'))
+# Working memory allowed while aggregating; batches shrink below STREAM_BATCH_SIZE to fit
+STREAM_MEMORY_BUDGET = int(os.environ.get('STREAM_MEMORY_BUDGET_MB', '64')) * 1024 * 1024
+
+
+# Per-day totals on a calendar array that grows to cover every day seen so far.
+# Its size depends on the date span only, never on the number of rows folded in.
+class DailyAccumulator:
+    def __init__(self):
+        self.first_day = None
+        self.sums = np.zeros((0, len(INDEX_COLUMNS)))
+
+    def add(self, days, values):
+        first, last = days.min(), days.max()
+        if self.first_day is None:
+            self.first_day = first
+        start = min(self.first_day, first)
+        end = max(self.first_day + max(len(self.sums) - 1, 0), last)
+        if start != self.first_day or (end - start).astype(int) + 1 != len(self.sums):
+            grown = np.zeros(((end - start).astype(int) + 1, len(INDEX_COLUMNS)))
+            offset = (self.first_day - start).astype(int)
+            grown[offset:offset + len(self.sums)] = self.sums
+            self.first_day, self.sums = start, grown
+        np.add.at(self.sums, (days - self.first_day).astype(int), values)
+
+    def frame(self):
+        index = pd.date_range(self.first_day, periods=len(self.sums)) if self.first_day is not None else pd.DatetimeIndex([])
+        daily = pd.DataFrame(self.sums, index=index, columns=INDEX_COLUMNS)
+        daily['Rows'] = daily['Rows'].astype(int)
+        daily.index.name = 'Date'
+        return daily
+
+
+# Typed arrays of one prepared batch: calendar days and the summed columns (NaN values
+# count as zero) with a trailing row count column
+def _batch_arrays(frame):
+    days = frame['Date'].to_numpy().astype('datetime64[D]')
+    values = frame[SALES_COLUMNS + QUANTITY_COLUMNS].fillna(0).to_numpy(dtype=float)
+    values = np.hstack([values, np.ones((len(frame), 1))])
+    return days, values, values.nbytes + days.nbytes
+
+
+# Daily totals folded from the source batch by batch, without materialising the data.
+# Each batch is sized so the raw batch read from the source (as reported by the source),
+# the prepared batch, its arrays and the accumulator stay within STREAM_MEMORY_BUDGET. Returns the daily frame and the run's statistics, which are
+# reported by the calling process (partitions may be aggregated in worker processes).
+def stream_daily_totals(store=None, until=None):
+    started, started_cpu = time.monotonic(), time.thread_time()
+    accumulator = DailyAccumulator()
+    sizing = {'batch_size': min(STREAM_BATCH_SIZE, 1000)}
+    rows = peak_bytes = 0
+    batches = source.batches(SALES_COLUMNS + QUANTITY_COLUMNS, store=store, batch_size=lambda: sizing['batch_size'], until=until)
+    for frame in batches:
+        if frame.empty:
+            continue
+        days, values, array_bytes = _batch_arrays(frame)
+        batch_bytes = frame.attrs.get('raw_bytes', 0) + int(frame.memory_usage(deep=True).sum()) + array_bytes
+        rows += len(frame)
+        accumulator.add(days, values)
+        peak_bytes = max(peak_bytes, batch_bytes + accumulator.sums.nbytes)
+
+        # Size the next batch from the measured cost per row
+        per_row = batch_bytes / len(frame)
+        room = STREAM_MEMORY_BUDGET - accumulator.sums.nbytes
+        sizing['batch_size'] = int(min(STREAM_BATCH_SIZE, max(1, room / per_row)))
+        del frame, days, values
+
+    stats = {'rows': rows, 'peak_bytes': peak_bytes, 'batch_size': sizing['batch_size'],
+             'seconds': time.monotonic() - started, 'cpu_seconds': time.thread_time() - started_cpu}
+    return accumulator.frame(), stats
+
+
+def _report_aggregation(stats):
+    metrics.incr("aggregation.runs")
+    metrics.set_gauge("aggregation.rows", stats['rows'])
+    metrics.set_gauge("aggregation.peak_bytes", stats['peak_bytes'])
+    metrics.set_gauge("aggregation.batch_size", stats['batch_size'])
+    metrics.set_gauge("aggregation.seconds", stats['seconds'])
+
+
+def _aggregate_partition(store, until=None):
+    daily, stats = stream_daily_totals(store, until)
+    _report_aggregation(stats)
+    return daily
+
+
+# Worker pools by (processes, niceness)
+_partition_pools = {}
+_partition_pool_lock = threading.Lock()
+
+# Aggregations started by a thread inside background_work() use that thread's pool
+_background = threading.local()
+
+
+# Mark the calling thread's work as background work (cache warming): partitions it
+# aggregates run in a separate pool of at most `workers` processes at niceness `nice`,
+# so they never take every core from live requests, and the CPU time those processes
+# spend for the thread is added to background_cpu_seconds().
+@contextlib.contextmanager
+def background_work(workers, nice):
+    _background.pool = (workers, nice)
+    try:
+        yield
+    finally:
+        del _background.pool
+
+
+def background_cpu_seconds():
+    return getattr(_background, 'cpu_seconds', 0.0)
+
+
+def _lower_process_priority(nice):
+    try:
+        os.nice(nice)
+    except (AttributeError, OSError):
+        pass
+
+
+# Worker processes are spawned rather than forked: a forked child must not reuse the
+# parent's MongoClient, and each spawned worker opens its own source.
+def _process_pool(workers, nice):
+    with _partition_pool_lock:
+        if (workers, nice) not in _partition_pools:
+            _partition_pools[(workers, nice)] = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_lower_process_priority if nice else None, initargs=(nice,) if nice else ())
+        return _partition_pools[(workers, nice)]
+
+
+# Daily totals of several partitions, each of the rows covered by its entry of `untils`,
+# one per worker process when there is more than one
+def _aggregate_partitions(stores, untils):
+    workers, nice = getattr(_background, 'pool', (PARTITION_WORKERS, 0))
+    workers = min(workers, PARTITION_WORKERS)
+    if workers <= 1 or len(stores) <= 1:
+        return [_aggregate_partition(store, until) for store, until in zip(stores, untils)]
+    results = []
+    for daily, stats in _process_pool(workers, nice).map(stream_daily_totals, stores, untils):
+        _report_aggregation(stats)
+        if hasattr(_background, 'pool'):
+            _background.cpu_seconds = background_cpu_seconds() + stats['cpu_seconds']
+        results.append(daily)
+    return results
+
+
+# Sum of per-partition daily frames on one contiguous calendar index
+def merge_daily(frames):
+    frames = [daily for daily in frames if not daily.empty]
+    if not frames:
+        return DailyAccumulator().frame()
+    merged = pd.concat(frames).groupby(level=0).sum()
+    merged = merged.reindex(pd.date_range(merged.index.min(), merged.index.max()), fill_value=0)
+    merged.index.name = 'Date'
+    return merged[INDEX_COLUMNS]
+
+
+# All-store daily totals: every partition keeps its own cached series, only partitions
+# whose version changed are re-aggregated (in parallel), then the series are merged
+def _merged_daily_sales():
+    frames, stale = [], []
+    for store in partitions():
+        version = get_data_version(store)
+        cached = _versioned_cache.get(('daily', store))
+        if cached is not None and cached[0] == version:
+            frames.append(cached[1])
+        else:
+            stale.append((store, version))
+    stores, versions = [store for store, _ in stale], [version for _, version in stale]
+    for store, version, daily in zip(stores, versions, _aggregate_partitions(stores, versions)):
+        _versioned_cache[('daily', store)] = (version, daily)
+        frames.append(daily)
+    return merge_daily(frames)
+
+
+# Daily per-product sales, quantities and row counts on a contiguous calendar index (days without
+# rows are zero), streamed from the source. Cached per partition until its data version changes.
+def daily_sales(store=None):
+    if store is None:
+        return _cached_for_version('daily', lambda version: _merged_daily_sales())
+    return _cached_for_version('daily', lambda version: _aggregate_partition(store, version), store)
+
+
+# Daily totals of exactly the rows `version` covers. An index stored under a version must
+# not hold rows written after its probe: added_since(version, ...) would add them again.
+# A partition's cached series is built that way; the merged all-store series is not (each
+# partition is read up to its own version), so all stores are re-read up to `version`.
+def _daily_for_version(store, version):
+    cached = _versioned_cache.get(('daily', store))
+    if store is not None and cached is not None and cached[0] == version:
+        return cached[1]
+    stores = [store] if store is not None else partitions()
+    return merge_daily(_aggregate_partitions(stores, [version] * len(stores)))
+
+
+# Cumulative sums of the daily series with a leading zero row: row i holds the totals
+# of every day before first_date + i days, so any date range total is prefix[hi] - prefix[lo].
+# Instances are never modified; extending one returns a new index.
+class PrefixIndex:
+    def __init__(self, first_date, prefix):
+        self.first_date = first_date
+        self.prefix = prefix
+
+    @classmethod
+    def from_daily(cls, daily):
+        values = daily[INDEX_COLUMNS].to_numpy(dtype=float)
+        prefix = np.vstack([np.zeros((1, len(INDEX_COLUMNS))), values.cumsum(axis=0)])
+        return cls(daily.index[0] if len(daily) else None, prefix)
+
+    @property
+    def days(self):
+        return len(self.prefix) - 1
+
+    def _position(self, date):
+        if self.first_date is None:
+            return 0
+        return min(max((date - self.first_date).days, 0), self.days)
+
+    # Totals of every row dated from start_date through the whole of end_date
+    def range_sums(self, start_date, end_date):
+        lo = self._position(pd.Timestamp(start_date).normalize())
+        hi = self._position(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1))
+        return pd.Series(self.prefix[max(lo, hi)] - self.prefix[lo], index=INDEX_COLUMNS)
+
+    # Index with the daily totals of newly added rows folded in, or None when some of
+    # them are dated before the last indexed day (the index must then be rebuilt)
+    def extended(self, daily_added):
+        if daily_added.empty:
+            return self
+        if self.first_date is None:
+            return PrefixIndex.from_daily(daily_added)
+        last_date = self.first_date + pd.Timedelta(days=self.days - 1)
+        if daily_added.index.min() < last_date:
+            return None
+        days = pd.date_range(last_date, daily_added.index.max())
+        values = daily_added[INDEX_COLUMNS].reindex(days, fill_value=0).to_numpy(dtype=float)
+        prefix = np.vstack([self.prefix[:-1], self.prefix[-1] + values.cumsum(axis=0)])
+        return PrefixIndex(self.first_date, prefix)
+
+
+# Verify every prefix index lookup against direct summation of the rows
+PREFIX_SELF_CHECK = os.environ.get('PREFIX_SELF_CHECK', '0') == '1'
+
+# (version, index) per partition, None being all stores
+_prefix_cache = {}
+
+
+# Daily totals of prepared batches (e.g. the rows added since a version), folded one
+# batch at a time
+def _fold_daily(batches):
+    accumulator = DailyAccumulator()
+    for frame in batches:
+        if not frame.empty:
+            days, values, _ = _batch_arrays(frame)
+            accumulator.add(days, values)
+    return accumulator.frame()
+
+
+# Extend the previous index with the documents inserted since its version when the
+# partition only grew; otherwise rebuild it from the daily series.
+def _build_prefix_index(previous, store, version):
+    if previous is not None:
+        previous_version, index = previous
+        added = source.added_since(previous_version, version, SALES_COLUMNS + QUANTITY_COLUMNS, store,
+                                   batch_size=STREAM_BATCH_SIZE)
+        if added is not None:
+            extended = index.extended(_fold_daily(added))
+            if extended is not None:
+                metrics.incr("prefix_index.extensions")
+                return version, extended
+    metrics.incr("prefix_index.rebuilds")
+    return version, PrefixIndex.from_daily(_daily_for_version(store, version))
+
+
+# Concurrent requests for the same partition and version share one build; builds of
+# other partitions run independently
+def prefix_index(store=None):
+    version = get_data_version(store)
+    entry = _prefix_cache.get(store)
+    if entry is None or entry[0] != version:
+        entry = data_flights.do(('prefix', store, version), _build_prefix_index, entry, store, version)
+        _prefix_cache[store] = entry
+    return entry[1]
+
+
+# Per-product sales and quantity totals plus the row count ('Rows') of a date range
+def range_sums(start_date, end_date, store=None):
+    sums = prefix_index(store).range_sums(start_date, end_date)
+    if PREFIX_SELF_CHECK:
+        rows = slice_range(start_date, end_date, store)
+        expected = rows[SALES_COLUMNS + QUANTITY_COLUMNS].sum()
+        expected['Rows'] = len(rows)
+        metrics.incr("prefix_index.checks")
+        if not np.allclose(sums.to_numpy(), expected[INDEX_COLUMNS].to_numpy(dtype=float)):
+            metrics.incr("prefix_index.mismatches")
+            print(f"Prefix index mismatch for {start_date} - {end_date}: {sums.to_dict()} != {expected.to_dict()}")
+            return expected[INDEX_COLUMNS].astype(float)
+    return sums
+
+
+def period_sums(label, granularity, store=None):
+    return range_sums(*period_bounds(parse_period(label, granularity), granularity), store)
+
+
+# Daily totals of the days with rows in one period label (2011-05, 2011-Q2, 2011-H1, 2011),
+# from the streamed daily series so no rows are held in memory
+def period_daily(label, granularity, store=None):
+    start_date, end_date = period_bounds(parse_period(label, granularity), granularity)
+    daily = daily_sales(store).loc[start_date:end_date]
+    return daily[daily['Rows'] > 0]
+
+
+# Period helpers: every granularity is a fixed number of months, so a period is
+# identified by an integer ordinal (months since year 0 divided by the period length).
+def period_ordinals(dates, granularity):
+    months = GRANULARITY_MONTHS[granularity]
+    month_ordinals = dates.dt.year * 12 + dates.dt.month - 1
+    return month_ordinals // months
+
+
+def period_label(ordinal, granularity):
+    months = GRANULARITY_MONTHS[granularity]
+    year, index = divmod(int(ordinal), 12 // months)
+    if granularity == 'monthly':
+        return f"{year}-{index + 1:02d}"
+    if granularity == 'quarterly':
+        return f"{year}-Q{index + 1}"
+    if granularity == 'halfyearly':
+        return f"{year}-H{index + 1}"
+    return f"{year}"
+
+
+def parse_period(label, granularity):
+    if not re.match(PERIOD_LABEL_PATTERNS[granularity], label):
+        raise ValueError(f"Invalid {granularity} period: {label}")
+    months = GRANULARITY_MONTHS[granularity]
+    year = int(label[:4])
+    if granularity == 'annual':
+        index = 0
+    else:
+        index = int(label[-2:].lstrip('-QH')) - 1
+        if granularity == 'monthly' and not 0 <= index < 12:
+            raise ValueError(f"Invalid {granularity} period: {label}")
+    return year * (12 // months) + index
+
+
+def period_bounds(ordinal, granularity):
+    months = GRANULARITY_MONTHS[granularity]
+    first_month = int(ordinal) * months
+    start_date = pd.Timestamp(year=first_month // 12, month=first_month % 12 + 1, day=1)
+    end_date = start_date + pd.DateOffset(months=months) - pd.DateOffset(days=1)
+    return start_date, end_date
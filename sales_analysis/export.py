@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import os
+import time
+from typing import Optional
+from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+import pandas as pd
+import metrics
+from dataset import (
+    SALES_COLUMNS,
+    QUANTITY_COLUMNS,
+    PARTITION_FIELD,
+    source,
+    get_data_version,
+    parse_period,
+    period_bounds,
+)
+from sources import DATE_FORMAT
+from conditional import validators, not_modified
+
+app = FastAPI()
+
+# CORS setup
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Change this to a specific origin in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Rows read from the data source per batch, and rows per streamed chunk
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '5000'))
+EXPORT_FIELDS = ['Date', PARTITION_FIELD] + SALES_COLUMNS + QUANTITY_COLUMNS
+
+
+# Range-filtered, projected batches from the data source as records in the stored
+# format ('Date' as dd-mm-yyyy, missing values as None)
+def _document_batches(start_date, end_date, store):
+    for frame in source.batches(EXPORT_FIELDS[1:], start_date, end_date, store, batch_size=EXPORT_BATCH_SIZE):
+        if frame.empty:
+            continue
+        frame = frame.assign(Date=frame['Date'].dt.strftime(DATE_FORMAT)).astype(object)
+        yield frame.where(frame.notna(), None).to_dict(orient='records')
+
+
+def _csv_chunk(batch, header=False):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    if header:
+        writer.writeheader()
+    writer.writerows(batch)
+    return buf.getvalue()
+
+
+def _ndjson_chunk(batch):
+    return ''.join(json.dumps(document) + '\n' for document in batch)
+
+
+async def _stream_rows(request, start_date, end_date, export_format, store):
+    started = time.monotonic()
+    rows = 0
+    if export_format == 'csv':
+        yield _csv_chunk([], header=True)
+    try:
+        async for batch in iterate_in_threadpool(_document_batches(start_date, end_date, store)):
+            # Stop reading from the source as soon as the client goes away
+            if await request.is_disconnected():
+                metrics.incr("export.disconnects")
+                break
+            rows += len(batch)
+            yield _csv_chunk(batch) if export_format == 'csv' else _ndjson_chunk(batch)
+    finally:
+        elapsed = time.monotonic() - started
+        metrics.incr("export.requests")
+        metrics.incr("export.rows", rows)
+        metrics.set_gauge("export.last_rows_per_second", rows / elapsed if elapsed else 0.0)
+
+
+# Stream the raw rows of a period (granularity + period) or of a start/end date range
+@app.get("/sales/export/")
+async def export_sales(
+    request: Request,
+    start: Optional[str] = Query(None, regex=r"^\d{4}-\d{2}-\d{2}$"),
+    end: Optional[str] = Query(None, regex=r"^\d{4}-\d{2}-\d{2}$"),
+    period: Optional[str] = Query(None),
+    granularity: str = Query('monthly', regex=r"^(monthly|quarterly|halfyearly|annual)$"),
+    export_format: str = Query('csv', alias='format', regex=r"^(csv|ndjson)$"),
+    store: Optional[str] = Query(None),
+):
+    try:
+        if period is not None:
+            start_date, end_date = period_bounds(parse_period(period, granularity), granularity)
+        elif start is not None and end is not None:
+            start_date, end_date = pd.Timestamp(start), pd.Timestamp(end)
+        else:
+            raise HTTPException(status_code=400, detail="Either period or both start and end are required.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Start date must not be after end date.")
+
+    # A client holding the export of the current data version gets a 304 instead of a re-read
+    kwargs = {'start': start, 'end': end, 'period': period, 'granularity': granularity,
+              'format': export_format, 'store': store}
+    version = await run_in_threadpool(get_data_version, store)
+    headers = validators(('export', tuple(sorted(kwargs.items()))), store, version, kwargs)
+    unchanged = not_modified(request, headers)
+    if unchanged is not None:
+        return unchanged
+
+    media_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"sales_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{export_format}"
+    return StreamingResponse(
+        _stream_rows(request, start_date, end_date, export_format, store),
+        media_type=media_type,
+        headers={**headers, 'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,105 @@
+from typing import Optional
+from fastapi import FastAPI, Query, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+import pandas as pd
+from dataset import (
+    SALES_COLUMNS,
+    GRANULARITY_MONTHS,
+    daily_sales,
+    period_ordinals,
+    period_bounds,
+    period_label,
+    parse_period,
+)
+
+app = FastAPI()
+
+# CORS setup
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Change this to a specific origin in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+# Aggregate sales per product for every period in one groupby pass.
+# Periods without any rows are left as NaN so they are not confused with zero sales.
+def aggregate_period_sales(df, granularity, first_ordinal, last_ordinal):
+    period_sales = df.groupby(period_ordinals(df['Date'], granularity))[SALES_COLUMNS].sum()
+    period_sales['Total'] = period_sales.sum(axis=1)
+    return period_sales.reindex(range(first_ordinal, last_ordinal + 1))
+
+
+# Absolute and percentage change of every period against the period `lag` steps earlier.
+# A missing period or baseline gives a null change; a zero baseline gives a null percentage.
+def compute_growth(period_sales, lag):
+    baseline = period_sales.shift(lag)
+    change = period_sales - baseline
+    percentage_change = change / baseline.where(baseline != 0) * 100
+    return baseline, change, percentage_change
+
+
+def _to_list(series):
+    return [None if pd.isna(value) else float(value) for value in series]
+
+
+@app.get("/sales/growth/")
+def sales_growth(
+    start: str = Query(...),
+    end: str = Query(...),
+    granularity: str = Query('monthly', regex=r"^(monthly|quarterly|halfyearly|annual)$"),
+    compare: str = Query('previous', regex=r"^(previous|yoy)$"),
+    store: Optional[str] = Query(None),
+):
+    try:
+        try:
+            start_ordinal = parse_period(start, granularity)
+            end_ordinal = parse_period(end, granularity)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if start_ordinal > end_ordinal:
+            raise HTTPException(status_code=400, detail="Start period must not be after end period.")
+
+        # Previous period, or the same period one year earlier
+        lag = 1 if compare == 'previous' else 12 // GRANULARITY_MONTHS[granularity]
+
+        first_date = period_bounds(start_ordinal - lag, granularity)[0]
+        last_date = period_bounds(end_ordinal, granularity)[1]
+        # Streamed daily totals; days without rows are left out so empty periods stay NaN
+        daily = daily_sales(store).loc[first_date:last_date]
+        df = daily[daily['Rows'] > 0].reset_index()
+        period_sales = aggregate_period_sales(df, granularity, start_ordinal - lag, end_ordinal)
+        baseline, change, percentage_change = compute_growth(period_sales, lag)
+
+        # Drop the leading baseline-only periods
+        selected = slice(start_ordinal, end_ordinal)
+        period_sales = period_sales.loc[selected]
+        if period_sales['Total'].isna().all():
+            raise HTTPException(status_code=404, detail="No data found for the selected range.")
+
+        growth = {
+            column: {
+                "sales": _to_list(period_sales[column]),
+                "baseline": _to_list(baseline.loc[selected, column]),
+                "change": _to_list(change.loc[selected, column]),
+                "percentage_change": _to_list(percentage_change.loc[selected, column]),
+            }
+            for column in period_sales.columns
+        }
+
+        return {
+            "granularity": granularity,
+            "compare": compare,
+            "periods": [period_label(ordinal, granularity) for ordinal in period_sales.index],
+            "baseline_periods": [period_label(ordinal - lag, granularity) for ordinal in period_sales.index],
+            "growth": growth,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,11 +1,16 @@
+from typing import Optional
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
-from pymongo import MongoClient
+from dataset import period_sums, period_daily, parse_period, period_label
+from charts import (
+    CHART_FORMAT_PATTERN,
+    bar_chart_data,
+    pie_chart_data,
+    line_chart_data,
+    render_bar_chart,
+    render_pie_chart,
+    render_line_chart,
+)
 
 app = FastAPI()
 
@@ -18,40 +23,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB setup
-client = MongoClient("mongodb://localhost:27017/")
-db = client['Sales']
-collection = db['Sales_data']
-
-# Helper function to fetch and prepare data from MongoDB
-def fetch_and_prepare_data():
-    all_documents = collection.find()
-    data_list = list(all_documents)
-    df = pd.DataFrame(data_list)
-
-    df.drop(['_id'], axis=1, inplace=True)
-    df['Date'] = pd.to_datetime(df['Date'], format='%d-%m-%Y', errors='coerce')
-    
-    df.dropna(subset=['Date'], inplace=True)
-    return df
-
 @app.get("/sales/halfyearly/total/")
-async def halfyearly_total_sales(selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$")):
+def halfyearly_total_sales(
+    selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$"),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        if selected_halfyear == "2011-H1":
-            start_date = pd.Timestamp('2011-01-01')
-            end_date = pd.Timestamp('2011-06-30')
-        else:
-            start_date = pd.Timestamp('2011-07-01')
-            end_date = pd.Timestamp('2011-12-31')
-
-        halfyear_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
+        # Look up the prefix-sum totals of the selected half-year
+        halfyear_sums = period_sums(selected_halfyear, 'halfyearly', store)
 
-        if halfyear_data.empty:
+        if not halfyear_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected half-year.")
 
-        total_sales = halfyear_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales = halfyear_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
         return {"total_sales": total_sales}
 
@@ -60,34 +44,24 @@ async def halfyearly_total_sales(selected_halfyear: str = Query(..., regex=r"^\d
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/halfyearly/by-products/")
-async def halfyearly_sales_by_products(selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$")):
+def halfyearly_sales_by_products(
+    selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        if selected_halfyear == "2011-H1":
-            start_date = pd.Timestamp('2011-01-01')
-            end_date = pd.Timestamp('2011-06-30')
-        else:
-            start_date = pd.Timestamp('2011-07-01')
-            end_date = pd.Timestamp('2011-12-31')
-
-        halfyear_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
+        # Look up the prefix-sum totals of the selected half-year
+        halfyear_sums = period_sums(selected_halfyear, 'halfyearly', store)
 
-        if halfyear_data.empty:
+        if not halfyear_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected half-year.")
 
-        product_sales = halfyear_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
+        product_sales = halfyear_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']]
 
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x=product_sales.index, y=product_sales.values, palette='Blues_d')
-        plt.title(f'Sales Distribution by Products in {selected_halfyear}')
-        plt.xlabel('Product Categories')
-        plt.ylabel('Total Sales')
+        if chart_format == 'data':
+            return {"sales_by_products_chart_data": bar_chart_data(product_sales, 'Total Sales')}
 
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        img_base64 = render_bar_chart(product_sales, f'Sales Distribution by Products in {selected_halfyear}')
 
         return {"sales_by_products_chart": img_base64}
 
@@ -96,32 +70,24 @@ async def halfyearly_sales_by_products(selected_halfyear: str = Query(..., regex
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/halfyearly/quantity-pie/")
-async def halfyearly_quantity_pie_chart(selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$")):
+def halfyearly_quantity_pie_chart(
+    selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        if selected_halfyear == "2011-H1":
-            start_date = pd.Timestamp('2011-01-01')
-            end_date = pd.Timestamp('2011-06-30')
-        else:
-            start_date = pd.Timestamp('2011-07-01')
-            end_date = pd.Timestamp('2011-12-31')
+        # Look up the prefix-sum totals of the selected half-year
+        halfyear_sums = period_sums(selected_halfyear, 'halfyearly', store)
 
-        halfyear_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-
-        if halfyear_data.empty:
+        if not halfyear_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected half-year.")
 
-        quantities = halfyear_data[['Q-P1', 'Q-P2', 'Q-P3', 'Q-P4']].sum()
+        quantities = halfyear_sums[['Q-P1', 'Q-P2', 'Q-P3', 'Q-P4']]
 
-        plt.figure(figsize=(8, 8))
-        plt.pie(quantities, labels=quantities.index, autopct='%1.1f%%', colors=sns.color_palette('pastel'))
-        plt.title(f'Quantity Sales Distribution for {selected_halfyear}')
+        if chart_format == 'data':
+            return {"quantity_sales_pie_chart_data": pie_chart_data(quantities, 'Quantity')}
 
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        img_base64 = render_pie_chart(quantities, f'Quantity Sales Distribution for {selected_halfyear}')
 
         return {"quantity_sales_pie_chart": img_base64}
 
@@ -130,31 +96,24 @@ async def halfyearly_quantity_pie_chart(selected_halfyear: str = Query(..., rege
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/halfyearly/comparison/")
-async def halfyearly_sales_comparison(selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$")):
+def halfyearly_sales_comparison(
+    selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$"),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        if selected_halfyear == "2011-H1":
-            start_date = pd.Timestamp('2011-01-01')
-            end_date = pd.Timestamp('2011-06-30')
-            prev_start_date = pd.Timestamp('2010-07-01')
-            prev_end_date = pd.Timestamp('2010-12-31')
-        else:
-            start_date = pd.Timestamp('2011-07-01')
-            end_date = pd.Timestamp('2011-12-31')
-            prev_start_date = pd.Timestamp('2011-01-01')
-            prev_end_date = pd.Timestamp('2011-06-30')
-
-        halfyear_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-        if halfyear_data.empty:
+        # Look up the prefix-sum totals of the selected half-year
+        halfyear_sums = period_sums(selected_halfyear, 'halfyearly', store)
+        if not halfyear_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected half-year.")
 
-        total_sales_selected_halfyear = halfyear_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales_selected_halfyear = halfyear_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
-        previous_halfyear_data = df[(df['Date'] >= prev_start_date) & (df['Date'] <= prev_end_date)]
-        if previous_halfyear_data.empty:
+        previous_halfyear = period_label(parse_period(selected_halfyear, 'halfyearly') - 1, 'halfyearly')
+        previous_halfyear_sums = period_sums(previous_halfyear, 'halfyearly', store)
+        if not previous_halfyear_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the previous half-year.")
 
-        total_sales_previous_halfyear = previous_halfyear_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales_previous_halfyear = previous_halfyear_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
         if total_sales_previous_halfyear == 0:
             percentage_change = float('inf') if total_sales_selected_halfyear != 0 else 0
@@ -163,7 +122,7 @@ async def halfyearly_sales_comparison(selected_halfyear: str = Query(..., regex=
 
         comparison_text = (
             f"Sales for {selected_halfyear}: ${total_sales_selected_halfyear:.2f}\n"
-            f"Sales for {selected_halfyear}: ${total_sales_previous_halfyear:.2f}\n"
+            f"Sales for {previous_halfyear}: ${total_sales_previous_halfyear:.2f}\n"
             f"Change: {'Increase' if total_sales_selected_halfyear > total_sales_previous_halfyear else 'Decrease'}\n"
             f"Percentage Change: {percentage_change:.2f}%"
         )
@@ -175,26 +134,20 @@ async def halfyearly_sales_comparison(selected_halfyear: str = Query(..., regex=
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/halfyearly/monthly-comparison/")
-async def halfyearly_monthly_comparison(selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$")):
+def halfyearly_monthly_comparison(
+    selected_halfyear: str = Query(..., regex=r"^\d{4}-H[12]$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        
-        # Define start and end dates for the selected half-year
-        if selected_halfyear == "2011-H1":
-            start_date = pd.Timestamp('2011-01-01')
-            end_date = pd.Timestamp('2011-06-30')
-        else:
-            start_date = pd.Timestamp('2011-07-01')
-            end_date = pd.Timestamp('2011-12-31')
-
-        # Filter data for the selected half-year
-        halfyear_data = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
+        # Daily totals of the selected half-year
+        halfyear_data = period_daily(selected_halfyear, 'halfyearly', store)
         if halfyear_data.empty:
             raise HTTPException(status_code=404, detail="No data found for the selected half-year.")
 
         # Aggregate monthly sales
-        halfyear_data['Month'] = halfyear_data['Date'].dt.to_period('M')
-        monthly_sales = halfyear_data.groupby('Month')[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
+        months = halfyear_data.index.to_period('M').rename('Month')
+        monthly_sales = halfyear_data.groupby(months)[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
         monthly_sales['Total'] = monthly_sales.sum(axis=1)
 
         # Prepare the data for JSON response
@@ -209,25 +162,17 @@ async def halfyearly_monthly_comparison(selected_halfyear: str = Query(..., rege
             }
         }
 
+        if chart_format == 'data':
+            return {
+                "chart_data": monthly_sales_json,
+                "monthly_sales_chart_data": line_chart_data(monthly_sales_json['months'], monthly_sales['Total'], 'Total Sales'),
+            }
+
         # Create monthly sales comparison bar chart
-        plt.figure(figsize=(12, 6))
-        plt.plot(monthly_sales.index.astype(str), monthly_sales['Total'], marker='o', color='skyblue', linestyle='-', label='Total Sales')
-        plt.title(f'Monthly Sales Comparison in {selected_halfyear}')
-        plt.xlabel('Month')
-        plt.ylabel('Total Sales')
-        plt.xticks(rotation=45)
-        plt.grid(True)
-        # Add the values of each point on the chart
-        for i, value in enumerate(monthly_sales['Total']):
-            plt.text(i, value, f'{value:.2f}', ha='center', va='bottom', fontsize=9)
-        plt.legend()
-
-        # Save the plot to a BytesIO object and encode it as base64
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        img_base64 = render_line_chart(
+            monthly_sales.index.astype(str), monthly_sales['Total'], f'Monthly Sales Comparison in {selected_halfyear}', 'Month', 'Total Sales',
+            value_format=lambda v: f'{v:.2f}', color='skyblue', fontsize=9, label='Total Sales'
+        )
 
         # Combine chart data and image into a JSON response
         return {
@@ -0,0 +1,280 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+from pymongo import InsertOne, UpdateOne
+from sources import (
+    SALES_COLUMNS,
+    QUANTITY_COLUMNS,
+    PARTITION_FIELD,
+    DEFAULT_PARTITION,
+    DATE_FORMAT,
+    DATE_VALUE_FIELD,
+    MongoSource,
+    partition_key,
+)
+
+# Imports always go to the Mongo collection (MONGO_URI), whichever DATA_SOURCE serves reads
+target = MongoSource()
+collection = target.collection
+# Accepted input date formats, tried in order; datetime values pass through as-is
+INPUT_DATE_FORMATS = [DATE_FORMAT, 'ISO8601', '%d/%m/%Y']
+VALUE_COLUMNS = SALES_COLUMNS + QUANTITY_COLUMNS
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xlsm', '.xls'):
+        return 'excel'
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    return 'csv'
+
+
+# Each reader yields DataFrames of at most `chunk_size` rows, so memory stays
+# bounded by the chunk size rather than the file size
+def read_csv_chunks(path, chunk_size):
+    yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+
+def read_parquet_chunks(path, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Reading Parquet files requires pyarrow (pip install pyarrow).")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def read_excel_chunks(path, chunk_size, sheet=None):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise SystemExit("Reading Excel files requires openpyxl (pip install openpyxl).")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = (workbook[sheet] if sheet else workbook.active).iter_rows(values_only=True)
+        header = [str(name).strip() if name is not None else '' for name in next(rows)]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+# Coerce a raw chunk to the collection schema. Returns the valid documents' frame
+# and the rejected rows with the reason they were rejected. `store` sets the partition
+# of every row; otherwise a partition column in the input is normalised to partition
+# keys, blank or missing values becoming None (the default partition).
+def coerce_chunk(chunk, store=None):
+    chunk = chunk.rename(columns=lambda name: str(name).strip())
+    missing = [column for column in ['Date'] + VALUE_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise SystemExit(f"Input is missing required columns: {', '.join(missing)}")
+
+    dates = pd.Series(pd.NaT, index=chunk.index, dtype='datetime64[ns]')
+    for date_format in INPUT_DATE_FORMATS:
+        unparsed = dates.isna()
+        if not unparsed.any():
+            break
+        dates[unparsed] = pd.to_datetime(chunk.loc[unparsed, 'Date'], format=date_format, errors='coerce')
+
+    values = chunk[VALUE_COLUMNS].apply(pd.to_numeric, errors='coerce')
+
+    reasons = pd.Series('', index=chunk.index)
+    reasons[dates.isna()] = 'invalid Date'
+    bad_values = values.isna()
+    for column in VALUE_COLUMNS:
+        reasons[bad_values[column] & (reasons == '')] = f"invalid {column}"
+
+    valid = reasons == ''
+    documents = values[valid].astype(float)
+    documents.insert(0, 'Date', dates[valid].dt.strftime(DATE_FORMAT))
+    documents[DATE_VALUE_FIELD] = dates[valid].dt.normalize()
+    if store is not None:
+        documents.insert(1, PARTITION_FIELD, partition_key(store))
+    elif PARTITION_FIELD in chunk.columns:
+        documents.insert(1, PARTITION_FIELD, chunk.loc[valid, PARTITION_FIELD].map(partition_key).astype(object))
+
+    rejected = chunk[~valid].copy()
+    rejected['reason'] = reasons[~valid]
+    return documents, rejected
+
+
+# Unordered bulk write of one batch; in upsert mode a reload replaces the row of each
+# date (of each store and date for partitioned rows). Rows of the default partition
+# are written without the partition field.
+def write_batch(documents, upsert):
+    records = [
+        {field: value for field, value in record.items() if not (field == PARTITION_FIELD and pd.isna(value))}
+        for record in documents.to_dict(orient='records')
+    ]
+    if upsert:
+        key_fields = ['Date', PARTITION_FIELD] if PARTITION_FIELD in documents.columns else ['Date']
+        # Within one batch the last row for a key wins
+        records = list({tuple(record.get(field) for field in key_fields): record for record in records}.values())
+        requests = [
+            UpdateOne(
+                # Not an equality on a missing partition, which the upsert would copy into the document
+                {field: record[field] if field in record else {'$exists': False} for field in key_fields},
+                {'$set': record},
+                upsert=True,
+            )
+            for record in records
+        ]
+    else:
+        requests = [InsertOne(record) for record in records]
+    result = collection.bulk_write(requests, ordered=False)
+    return result.inserted_count + result.upserted_count, result.modified_count
+
+
+# Partitions of a batch of documents, as keyed by the source's write markers
+def batch_partitions(documents):
+    if PARTITION_FIELD not in documents.columns:
+        return {DEFAULT_PARTITION}
+    return set(documents[PARTITION_FIELD].fillna(DEFAULT_PARTITION))
+
+
+# Indexes used by the readers (see sources.MongoSource)
+def create_read_indexes():
+    # Per-store data version probes (count and latest _id of one store)
+    collection.create_index([(PARTITION_FIELD, 1), ('_id', -1)])
+    # Date range reads (export, per-store aggregation) filter on the BSON date
+    collection.create_index(DATE_VALUE_FIELD)
+    collection.create_index([(PARTITION_FIELD, 1), (DATE_VALUE_FIELD, 1)])
+
+
+# Server-side update computing DATE_VALUE_FIELD from the dd-mm-yyyy 'Date' text. An
+# unparseable date gets null, which no date range matches (as before).
+BACKFILL_DATE_UPDATE = [{'$set': {DATE_VALUE_FIELD: {
+    '$dateFromString': {'dateString': '$Date', 'format': DATE_FORMAT, 'onError': None, 'onNull': None},
+}}}]
+
+
+# One-off migration of documents written before the importer stored DATE_VALUE_FIELD
+# (e.g. loaded by other scripts): until they have it, every date range read of the
+# collection parses 'Date' per document and cannot use the index. Runs in batches of
+# `batch_size` documents, so it can be interrupted and resumed.
+def backfill_date_field(batch_size=5000):
+    create_read_indexes()
+    totals = {'updated': 0}
+    started = time.monotonic()
+    while True:
+        ids = [document['_id'] for document in
+               collection.find({DATE_VALUE_FIELD: {'$exists': False}}, projection={'_id': 1}).limit(batch_size)]
+        if not ids:
+            break
+        result = collection.update_many({'_id': {'$in': ids}}, BACKFILL_DATE_UPDATE)
+        totals['updated'] += result.modified_count
+        elapsed = time.monotonic() - started
+        print(f"{totals['updated']} documents updated, {totals['updated'] / elapsed:.0f} documents/sec", file=sys.stderr)
+    totals['seconds'] = time.monotonic() - started
+    return totals
+
+
+def import_file(path, file_format=None, chunk_size=50000, batch_size=5000, upsert=True,
+                rejects_path=None, sheet=None, store=None):
+    file_format = file_format or detect_format(path)
+    if file_format == 'csv':
+        chunks = read_csv_chunks(path, chunk_size)
+    elif file_format == 'parquet':
+        chunks = read_parquet_chunks(path, chunk_size)
+    else:
+        chunks = read_excel_chunks(path, chunk_size, sheet)
+
+    if upsert:
+        # Without an index every upsert would scan the collection
+        collection.create_index('Date')
+        collection.create_index([(PARTITION_FIELD, 1), ('Date', 1)])
+    create_read_indexes()
+
+    totals = {'read': 0, 'written': 0, 'modified': 0, 'rejected': 0}
+    started = time.monotonic()
+    rejects_header = True
+    # Partitions whose existing documents were changed; an upsert that only rewrites
+    # documents changes neither the count nor the newest _id the readers' versions see
+    modified_partitions = set()
+
+    try:
+        for chunk in chunks:
+            documents, rejected = coerce_chunk(chunk, store)
+            totals['read'] += len(chunk)
+            totals['rejected'] += len(rejected)
+
+            if rejects_path and not rejected.empty:
+                rejected.to_csv(rejects_path, mode='w' if rejects_header else 'a', header=rejects_header, index=False)
+                rejects_header = False
+
+            for offset in range(0, len(documents), batch_size):
+                batch = documents.iloc[offset:offset + batch_size]
+                written, modified = write_batch(batch, upsert)
+                totals['written'] += written
+                totals['modified'] += modified
+                if modified:
+                    modified_partitions |= batch_partitions(batch)
+
+            elapsed = time.monotonic() - started
+            print(f"{totals['read']} rows read, {totals['rejected']} rejected, "
+                  f"{totals['read'] / elapsed:.0f} rows/sec", file=sys.stderr)
+    finally:
+        # Also after a failed run, for the batches that were already written
+        if modified_partitions:
+            target.mark_written(modified_partitions)
+
+    totals['seconds'] = time.monotonic() - started
+    totals['rows_per_second'] = totals['read'] / totals['seconds'] if totals['seconds'] else 0.0
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import sales data into MongoDB.")
+    parser.add_argument('path', nargs='?', help="CSV, Excel or Parquet file")
+    parser.add_argument('--format', dest='file_format', choices=['csv', 'excel', 'parquet'],
+                        help="input format (default: from the file extension)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="rows read and validated at a time")
+    parser.add_argument('--batch-size', type=int, default=5000, help="documents per bulk write")
+    parser.add_argument('--insert', action='store_true',
+                        help="plain inserts instead of upsert-by-date (faster, not idempotent)")
+    parser.add_argument('--rejects', help="write rejected rows and reasons to this CSV file")
+    parser.add_argument('--sheet', help="Excel sheet name (default: the active sheet)")
+    parser.add_argument('--store', help=f"partition ({PARTITION_FIELD}) of every imported row "
+                                        f"(default: the file's {PARTITION_FIELD} column, if any)")
+    parser.add_argument('--backfill-date-field', action='store_true',
+                        help=f"instead of importing, add the indexed {DATE_VALUE_FIELD} date to existing "
+                             f"documents without it")
+    args = parser.parse_args(argv)
+
+    if args.backfill_date_field:
+        if args.path:
+            parser.error("--backfill-date-field does not take an input file")
+        totals = backfill_date_field(args.batch_size)
+        print(f"Added {DATE_VALUE_FIELD} to {totals['updated']} documents in {totals['seconds']:.1f}s")
+        return
+    if not args.path:
+        parser.error("an input file is required")
+
+    totals = import_file(
+        args.path,
+        file_format=args.file_format,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        upsert=not args.insert,
+        rejects_path=args.rejects,
+        sheet=args.sheet,
+        store=args.store,
+    )
+    print(
+        f"Imported {totals['written']} new and {totals['modified']} updated rows "
+        f"({totals['rejected']} rejected of {totals['read']}) in {totals['seconds']:.1f}s, "
+        f"{totals['rows_per_second']:.0f} rows/sec"
+    )
+
+
+if __name__ == "__main__":
+    main()
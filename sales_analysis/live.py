@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+from typing import Optional
+from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import metrics
+from dataset import SALES_COLUMNS, INDEX_COLUMNS, get_data_version, parse_period, period_sums
+
+app = FastAPI()
+
+# CORS setup
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Change this to a specific origin in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Seconds between data version checks while anyone is subscribed
+LIVE_POLL_INTERVAL = float(os.environ.get('LIVE_POLL_INTERVAL', '2'))
+# Seconds of silence after which a keep-alive comment is sent
+LIVE_HEARTBEAT = float(os.environ.get('LIVE_HEARTBEAT', '15'))
+# Undelivered events kept per subscriber before it is resynchronised with a snapshot
+LIVE_QUEUE_SIZE = int(os.environ.get('LIVE_QUEUE_SIZE', '16'))
+
+
+# Totals of a period from the prefix-sum index, which new rows extend incrementally
+def _period_totals(label, granularity, store):
+    sums = period_sums(label, granularity, store)
+    totals = {column: float(sums[column]) for column in INDEX_COLUMNS}
+    totals['Total'] = sum(totals[column] for column in SALES_COLUMNS)
+    return totals
+
+
+# One subscribed (granularity, period, store) with the totals last pushed to its
+# subscribers. Every event is serialised once and the same text is queued for all
+# subscribers, so the cost per client is a queue append.
+class Topic:
+    def __init__(self, granularity, label, store, totals):
+        self.granularity = granularity
+        self.label = label
+        self.store = store
+        self.totals = totals
+        self.sequence = 0
+        self.subscribers = set()
+
+    def _event(self, name, data):
+        data = {"granularity": self.granularity, "period": self.label, "store": self.store, **data}
+        return f"id: {self.sequence}\nevent: {name}\ndata: {json.dumps(data)}\n\n"
+
+    def snapshot(self):
+        return self._event('snapshot', {"totals": self.totals})
+
+    # Push the change of every column that moved since the last event
+    def update(self, totals):
+        changes = {column: value - self.totals[column] for column, value in totals.items() if value != self.totals[column]}
+        if not changes:
+            return
+        self.totals = totals
+        self.sequence += 1
+        event = self._event('delta', {"changes": changes})
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client this far behind gets the current totals instead of the backlog
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot())
+                metrics.incr("live.resyncs")
+        metrics.incr("live.events")
+        metrics.incr("live.deliveries", len(self.subscribers))
+
+
+_topics = {}
+# Data version of each partition the subscribed totals were last computed at
+_versions = {}
+_creating = {}
+_watcher = None
+
+
+def _report():
+    metrics.set_gauge("live.topics", len(_topics))
+    metrics.set_gauge("live.subscribers", sum(len(topic.subscribers) for topic in _topics.values()))
+
+
+# Poll the data version (a high-water mark of the partition's rows) of every subscribed
+# partition and recompute its topics only when it moved. Runs while there are subscribers.
+async def _watch():
+    while _topics:
+        await asyncio.sleep(LIVE_POLL_INTERVAL)
+        for store in {topic.store for topic in _topics.values()}:
+            try:
+                version = await asyncio.to_thread(get_data_version, store)
+                if version == _versions.get(store):
+                    continue
+                _versions[store] = version
+                for topic in [topic for topic in _topics.values() if topic.store == store]:
+                    topic.update(await asyncio.to_thread(_period_totals, topic.label, topic.granularity, store))
+            except Exception as e:
+                print(f"Live update failed: {str(e)}")
+
+
+async def _create_topic(key):
+    granularity, label, store = key
+    version = await asyncio.to_thread(get_data_version, store)
+    totals = await asyncio.to_thread(_period_totals, label, granularity, store)
+    _topics[key] = Topic(granularity, label, store, totals)
+    _versions.setdefault(store, version)
+
+
+async def _subscribe(granularity, label, store):
+    global _watcher
+    key = (granularity, label, store)
+    if key not in _topics:
+        # Concurrent first subscribers of a topic share one read of its totals
+        creating = _creating.get(key)
+        if creating is None:
+            creating = _creating[key] = asyncio.ensure_future(_create_topic(key))
+            creating.add_done_callback(lambda _: _creating.pop(key, None))
+        await asyncio.shield(creating)
+    topic = _topics[key]
+    queue = asyncio.Queue(LIVE_QUEUE_SIZE)
+    topic.subscribers.add(queue)
+    if _watcher is None or _watcher.done():
+        _watcher = asyncio.create_task(_watch())
+    _report()
+    return topic, queue
+
+
+def _unsubscribe(topic, queue):
+    topic.subscribers.discard(queue)
+    key = (topic.granularity, topic.label, topic.store)
+    if not topic.subscribers and _topics.get(key) is topic:
+        del _topics[key]
+        if not any(other.store == topic.store for other in _topics.values()):
+            _versions.pop(topic.store, None)
+    _report()
+
+
+async def _stream_events(request, topic, queue):
+    try:
+        yield topic.snapshot()
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), LIVE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                event = ": keep-alive\n\n"
+            yield event
+    finally:
+        _unsubscribe(topic, queue)
+
+
+# Server-Sent Events stream of a period's totals: a 'snapshot' event on connect, then a
+# 'delta' event with the changed columns whenever new sales arrive
+@app.get("/sales/live/")
+async def live_sales(
+    request: Request,
+    period: str = Query(...),
+    granularity: str = Query('monthly', regex=r"^(monthly|quarterly|halfyearly|annual)$"),
+    store: Optional[str] = Query(None),
+):
+    try:
+        parse_period(period, granularity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        topic, queue = await _subscribe(granularity, period, store)
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        _stream_events(request, topic, queue),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
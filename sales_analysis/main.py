@@ -1,5 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import admission
+import metrics
+import warmer
+from cache import cached
 from monthly import (
     total_sales,
     sales_by_products,
@@ -28,9 +32,18 @@ from annual import (
     annual_sales_comparison,
     annual_monthly_comparison
 )
+from growth import sales_growth
+from rolling import rolling_sales
+from export import export_sales
+from live import live_sales
+from ranges import (
+    range_total_sales,
+    range_sales_by_products,
+    range_quantities
+)
 
-# Initialize FastAPI
-app = FastAPI()
+# Initialize FastAPI; the lifespan runs the background cache warmer
+app = FastAPI(lifespan=warmer.lifespan)
 
 # CORS setup
 app.add_middleware(
@@ -41,33 +54,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cache misses are admitted per route class: rendered PNG charts share the small 'render'
+# budget so a burst of them cannot slow down the 'light' numeric and chart data calls
+
 # Include monthly sales routes
-app.add_api_route("/sales/total/", total_sales)
-app.add_api_route("/sales/by-products/", sales_by_products)
-app.add_api_route("/sales/quantity-pie/", quantity_pie_chart)
-app.add_api_route("/sales/weekly/", weekly_sales)
-app.add_api_route("/sales/comparison/", sales_comparison)
+app.add_api_route("/sales/total/", cached(total_sales, admission.light))
+app.add_api_route("/sales/by-products/", cached(sales_by_products, admission.by_chart_format))
+app.add_api_route("/sales/quantity-pie/", cached(quantity_pie_chart, admission.by_chart_format))
+app.add_api_route("/sales/weekly/", cached(weekly_sales, admission.by_chart_format))
+app.add_api_route("/sales/comparison/", cached(sales_comparison, admission.light))
 
 # Include quarterly sales routes
-app.add_api_route("/sales/quarterly/total/", total_quarterly_sales)
-app.add_api_route("/sales/quarterly/by-products/", sales_quarterly_by_products)
-app.add_api_route("/sales/quarterly/quantity-pie/", quantity_quarterly_pie_chart)
-app.add_api_route("/sales/quarterly/comparison/", quarterly_sales_comparison)
-app.add_api_route("/sales/quarterly/monthly-comparison/", quarterly_monthly_comparison)
+app.add_api_route("/sales/quarterly/total/", cached(total_quarterly_sales, admission.light))
+app.add_api_route("/sales/quarterly/by-products/", cached(sales_quarterly_by_products, admission.by_chart_format))
+app.add_api_route("/sales/quarterly/quantity-pie/", cached(quantity_quarterly_pie_chart, admission.by_chart_format))
+app.add_api_route("/sales/quarterly/comparison/", cached(quarterly_sales_comparison, admission.light))
+app.add_api_route("/sales/quarterly/monthly-comparison/", cached(quarterly_monthly_comparison, admission.light))
 
 # Include half-yearly sales routes
-app.add_api_route("/sales/halfyearly/total/", halfyearly_total_sales)
-app.add_api_route("/sales/halfyearly/by-products/", halfyearly_sales_by_products)
-app.add_api_route("/sales/halfyearly/quantity-pie/", halfyearly_quantity_pie_chart)
-app.add_api_route("/sales/halfyearly/comparison/", halfyearly_sales_comparison)
-app.add_api_route("/sales/halfyearly/monthly-comparison/", halfyearly_monthly_comparison)
+app.add_api_route("/sales/halfyearly/total/", cached(halfyearly_total_sales, admission.light))
+app.add_api_route("/sales/halfyearly/by-products/", cached(halfyearly_sales_by_products, admission.by_chart_format))
+app.add_api_route("/sales/halfyearly/quantity-pie/", cached(halfyearly_quantity_pie_chart, admission.by_chart_format))
+app.add_api_route("/sales/halfyearly/comparison/", cached(halfyearly_sales_comparison, admission.light))
+app.add_api_route("/sales/halfyearly/monthly-comparison/", cached(halfyearly_monthly_comparison, admission.by_chart_format))
 
 # Include annual sales routes
-app.add_api_route("/sales/annual/total/", annual_total_sales)
-app.add_api_route("/sales/annual/by-products/", annual_sales_by_products)
-app.add_api_route("/sales/annual/quantity-pie/", annual_quantity_pie_chart)
-app.add_api_route("/sales/annual/comparison/", annual_sales_comparison)
-app.add_api_route("/sales/annual/monthly-comparison/", annual_monthly_comparison)
+app.add_api_route("/sales/annual/total/", cached(annual_total_sales, admission.light))
+app.add_api_route("/sales/annual/by-products/", cached(annual_sales_by_products, admission.by_chart_format))
+app.add_api_route("/sales/annual/quantity-pie/", cached(annual_quantity_pie_chart, admission.by_chart_format))
+app.add_api_route("/sales/annual/comparison/", cached(annual_sales_comparison, admission.light))
+app.add_api_route("/sales/annual/monthly-comparison/", cached(annual_monthly_comparison, admission.by_chart_format))
+
+# Include period-over-period growth route
+app.add_api_route("/sales/growth/", cached(sales_growth, admission.light))
+
+# Include rolling and cumulative metrics route
+app.add_api_route("/sales/rolling/", cached(rolling_sales, admission.light))
+
+# Include arbitrary date range routes
+app.add_api_route("/sales/range/total/", cached(range_total_sales, admission.light))
+app.add_api_route("/sales/range/by-products/", cached(range_sales_by_products, admission.light))
+app.add_api_route("/sales/range/quantities/", cached(range_quantities, admission.light))
+
+# Include raw data export route (streamed, never cached server-side)
+app.add_api_route("/sales/export/", export_sales)
+
+# Include live period totals route (Server-Sent Events, never cached)
+app.add_api_route("/sales/live/", live_sales)
+
+# Process metrics (request coalescing, cache, admission and warming counters)
+app.add_api_route("/metrics/", metrics.snapshot)
+
+# Warm the current and previous period of every dashboard route
+warmer.register_routes(app)
 
 if __name__ == "__main__":
     import uvicorn
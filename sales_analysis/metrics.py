@@ -0,0 +1,22 @@
+import threading
+from collections import defaultdict
+
+# Process-wide counters and gauges, exposed by the /metrics/ route
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot():
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
@@ -1,11 +1,17 @@
+from typing import Optional
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
-from pymongo import MongoClient
+from dataset import period_sums, period_daily
+from charts import (
+    CHART_FORMAT_PATTERN,
+    bar_chart_data,
+    pie_chart_data,
+    line_chart_data,
+    render_bar_chart,
+    render_pie_chart,
+    render_line_chart,
+)
 
 # Initialize FastAPI
 app = FastAPI()
@@ -19,44 +25,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB setup
-client = MongoClient("mongodb://localhost:27017/")
-db = client['Sales']
-collection = db['Sales_data']
-
-# Helper function to fetch and prepare data from MongoDB
-def fetch_and_prepare_data():
-    all_documents = collection.find()
-    data_list = list(all_documents)
-    df = pd.DataFrame(data_list)
-
-    # Drop '_id' column and handle date formatting
-    df.drop(['_id'], axis=1, inplace=True)
-    df['Date'] = pd.to_datetime(df['Date'], format='%d-%m-%Y', errors='coerce')
-    
-    # Drop rows with invalid dates
-    df.dropna(subset=['Date'], inplace=True)
-    return df
-
 # Endpoint for total sales
 @app.get("/sales/total/")
-async def total_sales(selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$")):
+def total_sales(
+    selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$"),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        df['YearMonth'] = df['Date'].dt.to_period('M')
-
-        # Log the filtered dataframe for debugging
-        print(f"Filtered data for {selected_month}:")
-        print(df[df['YearMonth'] == selected_month])
+        # Look up the prefix-sum totals of the selected month
+        specific_month_sums = period_sums(selected_month, 'monthly', store)
 
-        # Filter the data for the selected month
-        specific_month_data = df[df['YearMonth'] == selected_month]
-
-        if specific_month_data.empty:
+        if not specific_month_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected month.")
 
         # Sum the sales from columns 'S-P1', 'S-P2', 'S-P3', 'S-P4'
-        total_sales = specific_month_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales = specific_month_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
         return {"total_sales": total_sales}
 
@@ -67,33 +50,26 @@ async def total_sales(selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$")):
 
 # Endpoint for sales by different products (Bar Chart)
 @app.get("/sales/by-products/")
-async def sales_by_products(selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$")):
+def sales_by_products(
+    selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        df['YearMonth'] = df['Date'].dt.to_period('M')
-
-        # Filter the data for the selected month
-        specific_month_data = df[df['YearMonth'] == selected_month]
+        # Look up the prefix-sum totals of the selected month
+        specific_month_sums = period_sums(selected_month, 'monthly', store)
 
-        if specific_month_data.empty:
+        if not specific_month_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected month.")
 
         # Sum the sales for each product
-        product_sales = specific_month_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
+        product_sales = specific_month_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']]
+
+        if chart_format == 'data':
+            return {"sales_by_products_chart_data": bar_chart_data(product_sales, 'Total Sales')}
 
         # Plot the bar chart
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x=product_sales.index, y=product_sales.values, palette='Blues_d')
-        plt.title(f'Sales Distribution by Products in {selected_month}')
-        plt.xlabel('Product Categories')
-        plt.ylabel('Total Sales')
-
-        # Save the plot to a BytesIO object and encode it as base64
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        img_base64 = render_bar_chart(product_sales, f'Sales Distribution by Products in {selected_month}')
 
         return {"sales_by_products_chart": img_base64}
 
@@ -104,31 +80,26 @@ async def sales_by_products(selected_month: str = Query(..., regex=r"^\d{4}-\d{2
 
 # Endpoint for quantity sales (Pie Chart)
 @app.get("/sales/quantity-pie/")
-async def quantity_pie_chart(selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$")):
+def quantity_pie_chart(
+    selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        df['YearMonth'] = df['Date'].dt.to_period('M')
-
-        # Filter the data for the selected month
-        specific_month_data = df[df['YearMonth'] == selected_month]
+        # Look up the prefix-sum totals of the selected month
+        specific_month_sums = period_sums(selected_month, 'monthly', store)
 
-        if specific_month_data.empty:
+        if not specific_month_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected month.")
 
         # Sum the quantities for Q-P1 to Q-P4
-        quantities = specific_month_data[['Q-P1', 'Q-P2', 'Q-P3', 'Q-P4']].sum()
+        quantities = specific_month_sums[['Q-P1', 'Q-P2', 'Q-P3', 'Q-P4']]
 
-        # Plot the pie chart
-        plt.figure(figsize=(8, 8))
-        plt.pie(quantities, labels=quantities.index, autopct='%1.1f%%', colors=sns.color_palette('pastel'))
-        plt.title(f'Quantity Sales Distribution for {selected_month}')
+        if chart_format == 'data':
+            return {"quantity_sales_pie_chart_data": pie_chart_data(quantities, 'Quantity')}
 
-        # Save the plot to a BytesIO object and encode it as base64
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        # Plot the pie chart
+        img_base64 = render_pie_chart(quantities, f'Quantity Sales Distribution for {selected_month}')
 
         return {"quantity_sales_pie_chart": img_base64}
 
@@ -137,20 +108,18 @@ async def quantity_pie_chart(selected_month: str = Query(..., regex=r"^\d{4}-\d{
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/weekly/")
-async def weekly_sales(selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$")):
+def weekly_sales(
+    selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$"),
+    chart_format: str = Query('data', alias='format', regex=CHART_FORMAT_PATTERN),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()  # Replace with your data loading logic
-        df['YearMonth'] = df['Date'].dt.to_period('M')
-
-        # Filter data for the selected month
-        specific_month_data = df[df['YearMonth'] == selected_month]
+        # Daily totals of the selected month, indexed by date
+        specific_month_data = period_daily(selected_month, 'monthly', store)
 
         if specific_month_data.empty:
             raise HTTPException(status_code=404, detail="No data found for the selected month.")
 
-        # Set 'Date' as index
-        specific_month_data.set_index('Date', inplace=True)
-
         # Initialize the list with zero for the starting point
         weekly_totals = [0]
         weeks = [f"Start of {selected_month}"]
@@ -182,25 +151,14 @@ async def weekly_sales(selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$"))
 
             start_date = end_date + pd.DateOffset(days=1)
 
-        # Create the line graph
-        plt.figure(figsize=(12, 6))
-        plt.plot(weeks, weekly_totals, marker='o', color='blue', linestyle='-', linewidth=2)
-
-        plt.title(f'Weekly Sales in {selected_month}')
-        plt.xlabel('Weeks')
-        plt.ylabel('Weekly Sales')
-
-        for i, v in enumerate(weekly_totals):
-            plt.text(i, v, str(int(v)), ha='center', va='bottom', fontsize=12)
+        if chart_format == 'data':
+            return {"weekly_sales_chart_data": line_chart_data(weeks, weekly_totals, 'Weekly Sales')}
 
-        plt.grid(True)
-        plt.xticks(rotation=45, ha='right')  # Rotate x-axis labels for better readability
-
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        # Create the line graph
+        img_base64 = render_line_chart(
+            weeks, weekly_totals, f'Weekly Sales in {selected_month}', 'Weeks', 'Weekly Sales',
+            value_format=lambda v: str(int(v)), linewidth=2, tick_alignment='right'
+        )
 
         return {"weekly_sales_chart": img_base64}
 
@@ -209,31 +167,31 @@ async def weekly_sales(selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$"))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sales/comparison/")
-async def sales_comparison(selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$")):
+def sales_comparison(
+    selected_month: str = Query(..., regex=r"^\d{4}-\d{2}$"),
+    store: Optional[str] = Query(None),
+):
     try:
-        df = fetch_and_prepare_data()
-        df['YearMonth'] = df['Date'].dt.to_period('M')
+        # Look up the prefix-sum totals of the selected month
+        specific_month_sums = period_sums(selected_month, 'monthly', store)
 
-        # Filter data for the selected month
-        specific_month_data = df[df['YearMonth'] == selected_month]
-
-        if specific_month_data.empty:
+        if not specific_month_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the selected month.")
 
         # Calculate total sales for the selected month
-        total_sales_selected_month = specific_month_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales_selected_month = specific_month_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
         # Calculate the previous month
         previous_month = (pd.to_datetime(f"{selected_month}-01") - pd.DateOffset(months=1)).strftime('%Y-%m')
 
-        # Filter data for the previous month
-        previous_month_data = df[df['YearMonth'] == previous_month]
+        # Look up the prefix-sum totals of the previous month
+        previous_month_sums = period_sums(previous_month, 'monthly', store)
 
-        if previous_month_data.empty:
+        if not previous_month_sums['Rows']:
             raise HTTPException(status_code=404, detail="No data found for the previous month.")
 
         # Calculate total sales for the previous month
-        total_sales_previous_month = previous_month_data[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum().sum()
+        total_sales_previous_month = previous_month_sums[['S-P1', 'S-P2', 'S-P3', 'S-P4']].sum()
 
         # Calculate percentage change
         if total_sales_previous_month == 0:
@@ -0,0 +1,91 @@
+from typing import Optional
+from fastapi import FastAPI, Query, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+import pandas as pd
+from dataset import SALES_COLUMNS, QUANTITY_COLUMNS, range_sums
+
+app = FastAPI()
+
+# CORS setup
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Change this to a specific origin in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+
+# Totals of the rows between two dates (both inclusive) from the prefix-sum index
+def _range_sums(start, end, store):
+    try:
+        start_date = pd.Timestamp(start)
+        end_date = pd.Timestamp(end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Start date must not be after end date.")
+
+    sums = range_sums(start_date, end_date, store)
+    if not sums['Rows']:
+        raise HTTPException(status_code=404, detail="No data found for the selected range.")
+    return sums
+
+
+def _to_dict(series):
+    return {column: float(value) for column, value in series.items()}
+
+
+@app.get("/sales/range/total/")
+def range_total_sales(
+    start: str = Query(..., regex=DATE_PATTERN),
+    end: str = Query(..., regex=DATE_PATTERN),
+    store: Optional[str] = Query(None),
+):
+    try:
+        sums = _range_sums(start, end, store)
+        total_sales = sums[SALES_COLUMNS].sum()
+        return {"start": start, "end": end, "total_sales": float(total_sales)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/sales/range/by-products/")
+def range_sales_by_products(
+    start: str = Query(..., regex=DATE_PATTERN),
+    end: str = Query(..., regex=DATE_PATTERN),
+    store: Optional[str] = Query(None),
+):
+    try:
+        sums = _range_sums(start, end, store)
+        return {"start": start, "end": end, "product_sales": _to_dict(sums[SALES_COLUMNS])}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/sales/range/quantities/")
+def range_quantities(
+    start: str = Query(..., regex=DATE_PATTERN),
+    end: str = Query(..., regex=DATE_PATTERN),
+    store: Optional[str] = Query(None),
+):
+    try:
+        sums = _range_sums(start, end, store)
+        return {"start": start, "end": end, "quantities": _to_dict(sums[QUANTITY_COLUMNS])}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
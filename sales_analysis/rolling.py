@@ -0,0 +1,128 @@
+from typing import Optional
+from fastapi import FastAPI, Query, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+import numpy as np
+import pandas as pd
+from dataset import (
+    SALES_COLUMNS,
+    QUANTITY_COLUMNS,
+    daily_sales,
+    period_ordinals,
+    period_label,
+)
+
+app = FastAPI()
+
+# CORS setup
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Change this to a specific origin in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+MAX_WINDOW_DAYS = 3660
+
+
+# Rolling sums/means, running totals, year-to-date and trailing-twelve-month figures
+# over a contiguous daily frame. Every metric is a difference of two prefix sums, so
+# the whole frame is processed in O(n) whatever the window sizes. Windows reaching
+# back before the first day of `daily` are incomplete and come out as NaN.
+def rolling_metrics(daily, windows, range_start):
+    values = daily.to_numpy(dtype=float)
+    prefix = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+    positions = np.arange(len(daily))
+
+    def window_sums(starts):
+        sums = prefix[positions + 1] - prefix[np.clip(starts, 0, None)]
+        sums[starts < 0] = np.nan
+        return pd.DataFrame(sums, index=daily.index, columns=daily.columns)
+
+    metrics = {}
+    for window in windows:
+        sums = window_sums(positions - window + 1)
+        metrics[f"rolling_sum_{window}"] = sums
+        metrics[f"rolling_mean_{window}"] = sums / window
+
+    # Trailing twelve months: from the same day one year earlier (exclusive)
+    year_ago = daily.index - pd.DateOffset(years=1)
+    metrics["ttm"] = window_sums((year_ago - daily.index[0]).days.to_numpy() + 1)
+
+    # Year to date: window starts on January 1st of each row's year
+    year_start = pd.to_datetime(daily.index.year.astype(str) + '-01-01')
+    metrics["ytd"] = window_sums((year_start - daily.index[0]).days.to_numpy())
+
+    # Running total over the requested range only
+    start_position = int(daily.index.searchsorted(range_start))
+    cumulative = window_sums(np.full(len(daily), start_position))
+    cumulative.iloc[:start_position] = np.nan
+    metrics["cumulative"] = cumulative
+    return metrics
+
+
+def _to_list(series):
+    return [None if pd.isna(value) else float(value) for value in series]
+
+
+@app.get("/sales/rolling/")
+def rolling_sales(
+    start: str = Query(..., regex=r"^\d{4}-\d{2}-\d{2}$"),
+    end: str = Query(..., regex=r"^\d{4}-\d{2}-\d{2}$"),
+    granularity: str = Query('daily', regex=r"^(daily|monthly|quarterly|halfyearly|annual)$"),
+    windows: str = Query('7,30,90', regex=r"^\d+(,\d+)*$"),
+    measure: str = Query('sales', regex=r"^(sales|quantity)$"),
+    store: Optional[str] = Query(None),
+):
+    try:
+        try:
+            start_date = pd.Timestamp(start)
+            end_date = pd.Timestamp(end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if start_date > end_date:
+            raise HTTPException(status_code=400, detail="Start date must not be after end date.")
+
+        window_sizes = sorted({int(window) for window in windows.split(',')})
+        if window_sizes[0] < 1 or window_sizes[-1] > MAX_WINDOW_DAYS:
+            raise HTTPException(status_code=400, detail=f"Windows must be between 1 and {MAX_WINDOW_DAYS} days.")
+
+        columns = SALES_COLUMNS if measure == 'sales' else QUANTITY_COLUMNS
+        daily = daily_sales(store)[columns].copy()
+        daily['Total'] = daily.sum(axis=1)
+
+        # Look back far enough that every window is complete at the left edge of the range
+        lookback = max(window_sizes[-1], 366)
+        daily = daily.loc[start_date - pd.Timedelta(days=lookback):end_date]
+        if daily.loc[start_date:].empty:
+            raise HTTPException(status_code=404, detail="No data found for the selected range.")
+
+        metrics = rolling_metrics(daily, window_sizes, start_date)
+
+        # Report each metric at the last day of every period inside the range
+        in_range = daily.index >= start_date
+        if granularity == 'daily':
+            rows = np.flatnonzero(in_range)
+            labels = [date.strftime('%Y-%m-%d') for date in daily.index[rows]]
+        else:
+            ordinals = period_ordinals(daily.index[in_range].to_series(), granularity).to_numpy()
+            last_in_period = np.append(ordinals[1:] != ordinals[:-1], True)
+            rows = np.flatnonzero(in_range)[last_in_period]
+            labels = [period_label(ordinal, granularity) for ordinal in ordinals[last_in_period]]
+
+        return {
+            "granularity": granularity,
+            "measure": measure,
+            "periods": labels,
+            "metrics": {
+                column: {name: _to_list(frame[column].iloc[rows]) for name, frame in metrics.items()}
+                for column in daily.columns
+            },
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
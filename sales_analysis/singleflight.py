@@ -0,0 +1,85 @@
+import contextlib
+import functools
+import os
+import threading
+from fastapi import HTTPException
+import metrics
+from admission import GateBusy, gate_for
+
+# How long a coalesced request waits for the in-progress computation, in seconds
+WAIT_TIMEOUT = float(os.environ.get('SINGLEFLIGHT_TIMEOUT', '60'))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Concurrent calls with the same key share one execution of `fn`: the first caller
+# runs it, later callers block until it finishes and get the same result or exception.
+# `waiting`, when given, is a context manager factory entered by every blocked caller.
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, timeout=WAIT_TIMEOUT, waiting=None, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                metrics.set_gauge(f"singleflight.{self.name}.in_flight", len(self._calls))
+
+        if not leader:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            with waiting() if waiting is not None else contextlib.nullcontext():
+                if not call.done.wait(timeout):
+                    metrics.incr(f"singleflight.{self.name}.timeouts")
+                    raise TimeoutError(f"Timed out waiting for in-progress {self.name} call")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.incr(f"singleflight.{self.name}.executions")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            metrics.incr(f"singleflight.{self.name}.errors")
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                metrics.set_gauge(f"singleflight.{self.name}.in_flight", len(self._calls))
+            call.done.set()
+
+
+endpoint_flights = SingleFlight('endpoints')
+
+
+# Wrap a (synchronous) endpoint so identical concurrent requests run it once. With an
+# admission `gate`, the requests waiting for that run count against the gate's queue.
+# Background (cache warming) and live calls of an endpoint share runs; a `background`
+# run gives up with GateBusy when the gate has no spare capacity, and a live request
+# that was waiting for it then runs the endpoint itself.
+def coalesce(endpoint, gate=None, background=False):
+    @functools.wraps(endpoint)
+    def wrapper(**kwargs):
+        key = (endpoint.__module__, endpoint.__name__, tuple(sorted(kwargs.items())))
+        waiting = gate_for(gate, kwargs).queued if gate is not None else None
+        while True:
+            try:
+                return endpoint_flights.do(key, endpoint, waiting=waiting, **kwargs)
+            except TimeoutError as e:
+                raise HTTPException(status_code=504, detail=str(e))
+            except GateBusy:
+                if background:
+                    raise
+                metrics.incr("singleflight.endpoints.background_retries")
+
+    return wrapper
@@ -0,0 +1,466 @@
+import abc
+import itertools
+import os
+import sqlite3
+import sys
+import numpy as np
+import pandas as pd
+
+SALES_COLUMNS = ['S-P1', 'S-P2', 'S-P3', 'S-P4']
+QUANTITY_COLUMNS = ['Q-P1', 'Q-P2', 'Q-P3', 'Q-P4']
+
+# Document field holding the partition (store) of a sale. Documents without it belong
+# to DEFAULT_PARTITION; a store of None everywhere below means all stores.
+PARTITION_FIELD = os.environ.get('PARTITION_FIELD', 'Store')
+DEFAULT_PARTITION = os.environ.get('DEFAULT_PARTITION', 'default')
+
+# Storage format of the 'Date' field in Mongo, CSV and SQLite
+DATE_FORMAT = '%d-%m-%Y'
+# Indexed BSON date written next to 'Date' by the importer, used for Mongo date ranges
+DATE_VALUE_FIELD = os.environ.get('DATE_VALUE_FIELD', 'SaleDate')
+
+# Backend serving the sales rows: mongo, parquet, csv or sqlite
+DATA_SOURCE = os.environ.get('DATA_SOURCE', 'mongo')
+# File read by the parquet, csv and sqlite backends
+DATA_SOURCE_PATH = os.environ.get('DATA_SOURCE_PATH', '')
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+MONGO_DATABASE = os.environ.get('MONGO_DATABASE', 'Sales')
+MONGO_COLLECTION = os.environ.get('MONGO_COLLECTION', 'Sales_data')
+SQLITE_TABLE = os.environ.get('SQLITE_TABLE', 'Sales_data')
+
+# Write markers: a counter per partition (and one for all of them, under this key) that
+# writers bump whenever they change or delete existing rows. The row count and newest
+# _id/rowid only reveal added rows, so the marker is part of every version.
+ALL_PARTITIONS = '*'
+
+
+# Partition key of a stored partition value: text, with integral numbers written without
+# a decimal part (3 and 3.0 are both '3'); None for a missing, null or blank value
+def partition_key(value):
+    if value is None or pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        return str(int(value)) if float(value).is_integer() else str(value)
+    return str(value).strip() or None
+
+
+# Stored values whose partition key is `store`: the key itself, its number for a numeric
+# key, and null or blank values for the default partition
+def partition_values(store):
+    values = [store]
+    try:
+        number = float(store)
+    except ValueError:
+        number = None
+    if number is not None and partition_key(number) == store:
+        values.append(int(number) if number.is_integer() else number)
+    if store == DEFAULT_PARTITION:
+        values += [None, '']
+    return values
+
+
+def _batch_size(batch_size):
+    return max(1, int(batch_size()) if callable(batch_size) else int(batch_size))
+
+
+# Typed frame of raw rows: 'Date' parsed (rows with an invalid date dropped), value
+# columns numeric (unparseable values become NaN) and only the requested columns kept
+def prepare_frame(frame, columns):
+    prepared = pd.DataFrame(index=frame.index)
+    dates = frame['Date'] if 'Date' in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        prepared['Date'] = dates
+    else:
+        prepared['Date'] = pd.to_datetime(dates, format=DATE_FORMAT, errors='coerce')
+    for column in columns:
+        if column == PARTITION_FIELD:
+            prepared[column] = frame[column] if column in frame.columns else None
+        elif column in frame.columns:
+            prepared[column] = pd.to_numeric(frame[column], errors='coerce')
+        else:
+            prepared[column] = np.nan
+    return prepared.dropna(subset=['Date']).reset_index(drop=True)
+
+
+# Bytes of `count` raw records like `record` (a dict or tuple of Python objects),
+# estimated from that one record
+def records_bytes(record, count):
+    items = record.items() if isinstance(record, dict) else ((None, value) for value in record)
+    size = sys.getsizeof(record) + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in items)
+    return size * count
+
+
+# Record in the prepared frame how many bytes the raw batch it was built from took (the
+# fetched records and/or the unprepared frame), so consumers can budget for the peak
+def with_raw_bytes(frame, raw_bytes):
+    frame.attrs['raw_bytes'] = int(raw_bytes)
+    return frame
+
+
+# In-process date range and partition filter, for backends that cannot push them down
+def filter_frame(frame, start_date=None, end_date=None, store=None):
+    keep = pd.Series(True, index=frame.index)
+    if start_date is not None:
+        keep &= frame['Date'] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        keep &= frame['Date'] < pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    if store is not None:
+        stores = frame[PARTITION_FIELD] if PARTITION_FIELD in frame.columns else pd.Series(None, index=frame.index)
+        keys = stores.map(partition_key)
+        keep &= keys.eq(store) | (keys.isna() if store == DEFAULT_PARTITION else False)
+    return frame[keep]
+
+
+# A backend yields the sales rows as prepared DataFrame batches ('Date' plus the requested
+# columns), restricted to a date range (both ends inclusive) and a partition.
+# `batch_size` may be a callable, read before every batch, so a consumer can resize batches.
+# `until` (a version of the partition or of all data) leaves out rows added after that
+# version was probed, so a series built for a version can later be extended by exactly
+# added_since(version, ...); backends that never extend ignore it.
+class DataSource(abc.ABC):
+    @abc.abstractmethod
+    def batches(self, columns, start_date=None, end_date=None, store=None, batch_size=10000, until=None):
+        pass
+
+    # Fingerprint that changes whenever rows of the partition (None: any row) change
+    @abc.abstractmethod
+    def version(self, store=None):
+        pass
+
+    @abc.abstractmethod
+    def partitions(self):
+        pass
+
+    # Prepared batches (like batches()) of the rows added between two versions when the
+    # partition only grew, else None
+    def added_since(self, previous_version, version, columns, store=None, batch_size=10000):
+        return None
+
+    # Record that existing rows of these partitions were changed or deleted in place
+    def mark_written(self, stores):
+        pass
+
+
+class MongoSource(DataSource):
+    def __init__(self, uri=MONGO_URI, database=MONGO_DATABASE, collection=MONGO_COLLECTION):
+        from pymongo import MongoClient
+        self.client = MongoClient(uri)
+        self.collection = self.client[database][collection]
+        self.markers = self.client[database][f"{collection}_meta"]
+
+    @staticmethod
+    def partition_filter(store):
+        if store is None:
+            return {}
+        return {PARTITION_FIELD: {'$in': partition_values(store)}}
+
+    # Server-side date range filter on the indexed DATE_VALUE_FIELD. Documents written
+    # before that field existed (until `import_sales.py --backfill-date-field` adds it)
+    # are matched by parsing their dd-mm-yyyy 'Date' in the query instead; unparseable
+    # dates never match.
+    @staticmethod
+    def date_range_filter(start_date, end_date):
+        bounds = {}
+        if start_date is not None:
+            bounds['$gte'] = pd.Timestamp(start_date).to_pydatetime()
+        if end_date is not None:
+            bounds['$lt'] = (pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)).to_pydatetime()
+        if not bounds:
+            return {}
+        parsed_date = {'$dateFromString': {'dateString': '$Date', 'format': DATE_FORMAT, 'onError': None}}
+        legacy = {DATE_VALUE_FIELD: {'$exists': False},
+                  '$expr': {'$and': [{operator: [parsed_date, bound]} for operator, bound in bounds.items()]}}
+        return {'$or': [{DATE_VALUE_FIELD: bounds}, legacy]}
+
+    # Documents covered by a version: no newer _id than its newest one
+    @staticmethod
+    def until_filter(until):
+        from bson import ObjectId
+        if until is None or not ObjectId.is_valid(until[1] or ''):
+            return {}
+        return {'_id': {'$lte': ObjectId(until[1])}}
+
+    def _find_batches(self, query, columns, batch_size):
+        cursor = self.collection.find(
+            query,
+            projection={'_id': 0, 'Date': 1, **{column: 1 for column in columns}},
+            batch_size=_batch_size(batch_size),
+        )
+        try:
+            while True:
+                documents = list(itertools.islice(cursor, _batch_size(batch_size)))
+                if not documents:
+                    break
+                raw = pd.DataFrame(documents)
+                raw_bytes = records_bytes(documents[0], len(documents)) + raw.memory_usage(deep=True).sum()
+                frame = prepare_frame(raw, columns)
+                del documents, raw
+                yield with_raw_bytes(frame, raw_bytes)
+        finally:
+            cursor.close()
+
+    def batches(self, columns, start_date=None, end_date=None, store=None, batch_size=10000, until=None):
+        query = {**self.date_range_filter(start_date, end_date), **self.partition_filter(store), **self.until_filter(until)}
+        return self._find_batches(query, columns, batch_size)
+
+    def version(self, store=None):
+        query = self.partition_filter(store)
+        latest = self.collection.find_one(query, sort=[('_id', -1)], projection={'_id': 1})
+        count = self.collection.estimated_document_count() if store is None else self.collection.count_documents(query)
+        marker = self.markers.find_one({'_id': ALL_PARTITIONS if store is None else store})
+        return count, str(latest['_id']) if latest else None, marker['writes'] if marker else 0
+
+    def mark_written(self, stores):
+        for key in {ALL_PARTITIONS, *stores}:
+            self.markers.update_one({'_id': key}, {'$inc': {'writes': 1}}, upsert=True)
+
+    def partitions(self):
+        stores = {partition_key(value) or DEFAULT_PARTITION for value in self.collection.distinct(PARTITION_FIELD)}
+        if self.collection.find_one({PARTITION_FIELD: None}, projection={'_id': 1}):
+            stores.add(DEFAULT_PARTITION)
+        return sorted(stores)
+
+    # New documents have larger ObjectIds; the counts tell whether anything was removed
+    # and the write marker whether anything was changed in place
+    def added_since(self, previous_version, version, columns, store=None, batch_size=10000):
+        from bson import ObjectId
+        (previous_count, previous_latest, previous_writes), (count, latest, writes) = previous_version, version
+        if not ObjectId.is_valid(previous_latest or '') or not ObjectId.is_valid(latest or '') or writes != previous_writes:
+            return None
+        # Bounded by the version's newest _id, so rows written after the probe are left to the next version
+        query = {**self.partition_filter(store), '_id': {'$gt': ObjectId(previous_latest), '$lte': ObjectId(latest)}}
+        if previous_count + self.collection.count_documents(query) != count:
+            return None
+        return self._find_batches(query, columns, batch_size)
+
+
+# File backends are versioned by the file's size and modification time, so any change
+# to the file invalidates every partition.
+class FileSource(DataSource):
+    def __init__(self, path=DATA_SOURCE_PATH):
+        if not path:
+            raise ValueError(f"DATA_SOURCE_PATH is required for the {DATA_SOURCE} data source.")
+        self.path = path
+
+    def version(self, store=None):
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def partitions(self):
+        stores = set()
+        for frame in self.batches([PARTITION_FIELD], batch_size=100000):
+            stores.update(frame[PARTITION_FIELD].map(partition_key).fillna(DEFAULT_PARTITION))
+        return sorted(stores)
+
+
+class CsvSource(FileSource):
+    def batches(self, columns, start_date=None, end_date=None, store=None, batch_size=10000, until=None):
+        wanted = {'Date', PARTITION_FIELD, *columns}
+        reader = pd.read_csv(self.path, usecols=lambda name: name in wanted, dtype={'Date': str, PARTITION_FIELD: str},
+                             iterator=True)
+        with reader:
+            while True:
+                try:
+                    chunk = reader.get_chunk(_batch_size(batch_size))
+                except StopIteration:
+                    break
+                raw_bytes = chunk.memory_usage(deep=True).sum()
+                frame = prepare_frame(chunk, list(dict.fromkeys(columns + [PARTITION_FIELD])))
+                frame = filter_frame(frame, start_date, end_date, store)
+                del chunk
+                yield with_raw_bytes(frame[['Date'] + columns], raw_bytes)
+
+
+# Tables of `batch_size` rows (read before every batch, like the other backends' batches)
+# cut from the scanner's record batches, whose size is fixed when the scan starts
+def _rebatched(record_batches, batch_size):
+    import pyarrow as pa
+    pending = None
+    for record_batch in record_batches:
+        table = pa.Table.from_batches([record_batch])
+        pending = table if pending is None else pa.concat_tables([pending, table])
+        size = _batch_size(batch_size)
+        while pending.num_rows >= size:
+            yield pending.slice(0, size)
+            pending = pending.slice(size)
+            size = _batch_size(batch_size)
+    if pending is not None and pending.num_rows:
+        yield pending
+
+
+# Row groups are skipped using the Parquet statistics when the filters allow it
+# ('Date' stored as a timestamp, or a partition column)
+class ParquetSource(FileSource):
+    def batches(self, columns, start_date=None, end_date=None, store=None, batch_size=10000, until=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+        except ImportError:
+            raise RuntimeError("The parquet data source requires pyarrow (pip install pyarrow).")
+        dataset = ds.dataset(self.path, format='parquet')
+        names = dataset.schema.names
+        conditions = []
+        # Pushed down for text partition columns; other types are matched by filter_frame
+        if store is not None and PARTITION_FIELD in names:
+            if pa.types.is_string(dataset.schema.field(PARTITION_FIELD).type):
+                values = [value for value in partition_values(store) if isinstance(value, str)]
+                condition = ds.field(PARTITION_FIELD).isin(values)
+                if store == DEFAULT_PARTITION:
+                    condition = condition | ds.field(PARTITION_FIELD).is_null()
+                conditions.append(condition)
+        elif store is not None and store != DEFAULT_PARTITION:
+            return
+        if 'Date' in names and pa.types.is_timestamp(dataset.schema.field('Date').type):
+            date_type = dataset.schema.field('Date').type
+            if start_date is not None:
+                conditions.append(ds.field('Date') >= pa.scalar(pd.Timestamp(start_date).to_pydatetime(), type=date_type))
+            if end_date is not None:
+                after_end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+                conditions.append(ds.field('Date') < pa.scalar(after_end.to_pydatetime(), type=date_type))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        projected = [name for name in dict.fromkeys(['Date', PARTITION_FIELD] + columns) if name in names]
+        scanned = dataset.to_batches(columns=projected, filter=expression, batch_size=_batch_size(batch_size))
+        for batch in _rebatched(scanned, batch_size):
+            raw = batch.to_pandas()
+            raw_bytes = batch.nbytes + raw.memory_usage(deep=True).sum()
+            frame = prepare_frame(raw, list(dict.fromkeys(columns + [PARTITION_FIELD])))
+            del batch, raw
+            yield with_raw_bytes(filter_frame(frame, start_date, end_date, store)[['Date'] + columns], raw_bytes)
+
+
+# Reads a table with the same columns as the Mongo documents ("Date" as dd-mm-yyyy text).
+# Versioned like Mongo by row count, largest rowid and the write marker kept in the
+# "<table>_meta" table, so appended rows extend caches.
+class SqliteSource(FileSource):
+    def __init__(self, path=DATA_SOURCE_PATH, table=SQLITE_TABLE):
+        super().__init__(path)
+        self.table = table
+        self.markers = f"{table}_meta"
+
+    @staticmethod
+    def _quote(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def _connect(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def _table_columns(self, connection):
+        return [row[1] for row in connection.execute(f'PRAGMA table_info({self._quote(self.table)})')]
+
+    def _where(self, connection, start_date=None, end_date=None, store=None, until=None):
+        conditions, parameters = [], []
+        # Rows covered by a version: no larger rowid than its largest one
+        if until is not None and until[1] is not None:
+            conditions.append('rowid <= ?')
+            parameters.append(until[1])
+        if store is not None:
+            if PARTITION_FIELD in self._table_columns(connection):
+                values = [value for value in partition_values(store) if value is not None]
+                conditions.append(f'("{PARTITION_FIELD}" IN ({", ".join("?" * len(values))})'
+                                  + (f' OR "{PARTITION_FIELD}" IS NULL)' if store == DEFAULT_PARTITION else ')'))
+                parameters += values
+            elif store != DEFAULT_PARTITION:
+                conditions.append('0')
+        # dd-mm-yyyy reordered to yyyy-mm-dd compares chronologically
+        iso_date = 'substr("Date", 7, 4) || \'-\' || substr("Date", 4, 2) || \'-\' || substr("Date", 1, 2)'
+        if start_date is not None:
+            conditions.append(f'{iso_date} >= ?')
+            parameters.append(pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+        if end_date is not None:
+            conditions.append(f'{iso_date} <= ?')
+            parameters.append(pd.Timestamp(end_date).strftime('%Y-%m-%d'))
+        return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', parameters
+
+    def _select(self, connection, columns, where, parameters, batch_size):
+        available = self._table_columns(connection)
+        selected = [column for column in ['Date'] + columns if column in available]
+        cursor = connection.execute(
+            f'SELECT {", ".join(self._quote(column) for column in selected)} FROM {self._quote(self.table)}{where}',
+            parameters,
+        )
+        while True:
+            rows = cursor.fetchmany(_batch_size(batch_size))
+            if not rows:
+                break
+            raw = pd.DataFrame(rows, columns=selected)
+            raw_bytes = records_bytes(rows[0], len(rows)) + raw.memory_usage(deep=True).sum()
+            frame = prepare_frame(raw, columns)
+            del rows, raw
+            yield with_raw_bytes(frame, raw_bytes)
+
+    def batches(self, columns, start_date=None, end_date=None, store=None, batch_size=10000, until=None):
+        connection = self._connect()
+        try:
+            where, parameters = self._where(connection, start_date, end_date, store, until)
+            yield from self._select(connection, columns, where, parameters, batch_size)
+        finally:
+            connection.close()
+
+    def _writes(self, connection, store):
+        exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [self.markers]).fetchone()
+        if not exists:
+            return 0
+        marker = connection.execute(f'SELECT writes FROM {self._quote(self.markers)} WHERE partition = ?',
+                                    [ALL_PARTITIONS if store is None else store]).fetchone()
+        return marker[0] if marker else 0
+
+    def version(self, store=None):
+        connection = self._connect()
+        try:
+            where, parameters = self._where(connection, store=store)
+            count, latest = connection.execute(f'SELECT COUNT(*), MAX(rowid) FROM {self._quote(self.table)}{where}', parameters).fetchone()
+            return count, latest, self._writes(connection, store)
+        finally:
+            connection.close()
+
+    def mark_written(self, stores):
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                connection.execute(f'CREATE TABLE IF NOT EXISTS {self._quote(self.markers)} (partition TEXT PRIMARY KEY, writes INTEGER NOT NULL)')
+                connection.executemany(
+                    f'INSERT INTO {self._quote(self.markers)} (partition, writes) VALUES (?, 1) '
+                    f'ON CONFLICT (partition) DO UPDATE SET writes = writes + 1',
+                    [[key] for key in {ALL_PARTITIONS, *stores}],
+                )
+        finally:
+            connection.close()
+
+    def _query_batches(self, columns, where, parameters, batch_size):
+        connection = self._connect()
+        try:
+            yield from self._select(connection, columns, where, parameters, batch_size)
+        finally:
+            connection.close()
+
+    def added_since(self, previous_version, version, columns, store=None, batch_size=10000):
+        (previous_count, previous_latest, previous_writes), (count, latest, writes) = previous_version, version
+        if previous_latest is None or latest is None or writes != previous_writes:
+            return None
+        connection = self._connect()
+        try:
+            where, parameters = self._where(connection, store=store, until=version)
+            where = f'{where} AND rowid > ?'
+            parameters = parameters + [previous_latest]
+            added = connection.execute(f'SELECT COUNT(*) FROM {self._quote(self.table)}{where}', parameters).fetchone()[0]
+        finally:
+            connection.close()
+        if previous_count + added != count:
+            return None
+        return self._query_batches(columns, where, parameters, batch_size)
+
+
+SOURCES = {
+    'mongo': MongoSource,
+    'parquet': ParquetSource,
+    'csv': CsvSource,
+    'sqlite': SqliteSource,
+}
+
+
+def get_source(name=DATA_SOURCE):
+    if name not in SOURCES:
+        raise ValueError(f"Unknown DATA_SOURCE '{name}', expected one of: {', '.join(SOURCES)}")
+    return SOURCES[name]()
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+# The application modules import each other as top-level modules (run from sales_analysis/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sources import SALES_COLUMNS, QUANTITY_COLUMNS, PARTITION_FIELD, SqliteSource  # noqa: E402
+
+TABLE_COLUMNS = ['Date', PARTITION_FIELD] + SALES_COLUMNS + QUANTITY_COLUMNS
+
+
+# A SQLite sales table laid out like the Mongo documents, read through SqliteSource
+class SqliteSales:
+    def __init__(self, path):
+        self.path = str(path)
+        with sqlite3.connect(self.path) as connection:
+            connection.execute(f'CREATE TABLE Sales_data ({", ".join(f"{column!r}" for column in TABLE_COLUMNS)})')
+
+    # Append rows given as (dd-mm-yyyy date, store, S-P1); the other columns are 1
+    def append(self, rows):
+        values = [[date, store, amount] + [1] * (len(TABLE_COLUMNS) - 3) for date, store, amount in rows]
+        with sqlite3.connect(self.path) as connection:
+            connection.executemany(f'INSERT INTO Sales_data VALUES ({", ".join("?" * len(TABLE_COLUMNS))})', values)
+
+    def source(self, append_after_first_probe=None):
+        if append_after_first_probe:
+            return AppendAfterFirstProbe(self, append_after_first_probe)
+        return SqliteSource(self.path)
+
+
+# SqliteSource that appends rows right after its first version probe, i.e. while whatever
+# is built for that version is still being read
+class AppendAfterFirstProbe(SqliteSource):
+    def __init__(self, sales, rows):
+        super().__init__(sales.path)
+        self.sales = sales
+        self.rows = rows
+
+    def version(self, store=None):
+        version = super().version(store)
+        if self.rows:
+            self.sales.append(self.rows)
+            self.rows = None
+        return version
+
+
+@pytest.fixture
+def sqlite_sales(tmp_path):
+    return SqliteSales(tmp_path / 'sales.db')
+
+
+# Point the dataset module at a source with empty caches, probing the data version on
+# every call and aggregating partitions in-process
+@pytest.fixture
+def use_source(monkeypatch):
+    import dataset
+
+    def use(data_source):
+        monkeypatch.setattr(dataset, 'source', data_source)
+        monkeypatch.setattr(dataset, 'DATA_VERSION_TTL', 0)
+        monkeypatch.setattr(dataset, 'PARTITION_WORKERS', 1)
+        monkeypatch.setattr(dataset, '_version_cache', {})
+        monkeypatch.setattr(dataset, '_versioned_cache', {})
+        monkeypatch.setattr(dataset, '_prefix_cache', {})
+        return data_source
+    return use
+
+
+# The same sales rows, given as (dd-mm-yyyy date, store, S-P1), in every file backend's format
+@pytest.fixture
+def sales_files(tmp_path, sqlite_sales):
+    from sources import CsvSource, ParquetSource
+    import pandas as pd
+
+    def write(rows):
+        sqlite_sales.append(rows)
+        frame = pd.DataFrame([[date, store, amount] + [1] * (len(TABLE_COLUMNS) - 3) for date, store, amount in rows],
+                             columns=TABLE_COLUMNS)
+        frame.to_csv(tmp_path / 'sales.csv', index=False)
+        # Parquet stores the dates as timestamps, so date ranges are pushed down (invalid dates as nulls)
+        frame.assign(Date=pd.to_datetime(frame['Date'], format='%d-%m-%Y', errors='coerce')).to_parquet(tmp_path / 'sales.parquet')
+        return {
+            'csv': CsvSource(str(tmp_path / 'sales.csv')),
+            'parquet': ParquetSource(str(tmp_path / 'sales.parquet')),
+            'sqlite': sqlite_sales.source(),
+        }
+    return write
@@ -0,0 +1,126 @@
+import threading
+import pytest
+from fastapi import HTTPException
+from admission import AdmissionGate, GateBusy, limited
+
+
+# Occupy `count` running slots of the gate until the returned event is set
+def hold_slots(gate, count):
+    release = threading.Event()
+    entered = threading.Semaphore(0)
+
+    def hold():
+        with gate.slot():
+            entered.release()
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        entered.acquire()
+    return release, threads
+
+
+def release_all(release, threads):
+    release.set()
+    for thread in threads:
+        thread.join()
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    gate = AdmissionGate('test', 1, 0)
+    release, threads = hold_slots(gate, 1)
+    try:
+        with pytest.raises(HTTPException) as excinfo:
+            with gate.slot():
+                pass
+        assert excinfo.value.status_code == 503
+        assert int(excinfo.value.headers['Retry-After']) >= 1
+    finally:
+        release_all(release, threads)
+
+
+def test_queued_call_times_out():
+    gate = AdmissionGate('test', 1, 1)
+    release, threads = hold_slots(gate, 1)
+    try:
+        with pytest.raises(HTTPException) as excinfo:
+            with gate.slot(timeout=0.05):
+                pass
+        assert excinfo.value.status_code == 503
+        assert gate._waiting == 0
+    finally:
+        release_all(release, threads)
+
+
+def test_queued_call_runs_when_a_slot_frees():
+    gate = AdmissionGate('test', 1, 1)
+    release, threads = hold_slots(gate, 1)
+    ran = []
+    waiter = threading.Thread(target=lambda: gate.slot(timeout=5).__enter__() or ran.append(1))
+    waiter.start()
+    release_all(release, threads)
+    waiter.join()
+    assert ran == [1]
+
+
+def test_coalesced_waiters_take_queue_positions():
+    gate = AdmissionGate('test', 1, 1)
+    with gate.queued():
+        assert gate._waiting == 1
+        with pytest.raises(HTTPException):
+            with gate.queued():
+                pass
+    assert gate._waiting == 0
+
+
+def test_background_calls_leave_a_slot_for_live_requests():
+    gate = AdmissionGate('test', 2, 4)
+    with gate.slot(background=True):
+        pass
+
+    release, threads = hold_slots(gate, 1)
+    try:
+        with pytest.raises(GateBusy):
+            with gate.slot(background=True):
+                pass
+        # A live request still gets the remaining slot
+        with gate.slot(timeout=0):
+            pass
+    finally:
+        release_all(release, threads)
+
+
+def test_background_calls_on_a_single_slot_gate_need_it_idle():
+    gate = AdmissionGate('test', 1, 4)
+    with gate.slot(background=True):
+        pass
+    release, threads = hold_slots(gate, 1)
+    try:
+        with pytest.raises(GateBusy):
+            with gate.slot(background=True):
+                pass
+    finally:
+        release_all(release, threads)
+
+
+def test_chart_calls_take_the_render_budget_only_for_png():
+    import admission
+    assert admission.by_chart_format({'chart_format': 'png', 'store': None}) is admission.render
+    assert admission.by_chart_format({'chart_format': 'data', 'store': None}) is admission.light
+    assert admission.by_chart_format({'store': None}) is admission.light
+
+
+def test_limited_admits_each_call_through_the_gate_picked_from_its_arguments():
+    cheap = AdmissionGate('cheap', 1, 0)
+    expensive = AdmissionGate('expensive', 1, 0)
+    endpoint = limited(lambda chart_format: chart_format, lambda kwargs: expensive if kwargs['chart_format'] == 'png' else cheap)
+
+    release, threads = hold_slots(expensive, 1)
+    try:
+        assert endpoint(chart_format='data') == 'data'
+        with pytest.raises(HTTPException):
+            endpoint(chart_format='png')
+    finally:
+        release_all(release, threads)
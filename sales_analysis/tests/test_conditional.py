@@ -0,0 +1,103 @@
+from email.utils import formatdate
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+import conditional
+from conditional import _cache_control, _client_is_current, not_modified
+
+CLOSED = f"public, max-age={conditional.CLOSED_PERIOD_MAX_AGE}, immutable"
+OPEN = f"public, max-age={conditional.OPEN_PERIOD_MAX_AGE}"
+HEADERS = {'ETag': '"abc"', 'Last-Modified': formatdate(1300000000, usegmt=True)}
+
+
+def request(method='GET', **headers):
+    return SimpleNamespace(method=method, headers={name.replace('_', '-'): value for name, value in headers.items()})
+
+
+@pytest.mark.parametrize('if_none_match, current', [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"old", "abc"', True),
+    ('"old"', False),
+    ('abc', False),
+    # Not honoured: the request may have no representation at all
+    ('*', False),
+])
+def test_entity_tags(if_none_match, current):
+    assert _client_is_current(request(if_none_match=if_none_match), HEADERS) is current
+
+
+@pytest.mark.parametrize('seconds, current', [
+    (1300000000, True),
+    (1300000001, True),
+    (1299999999, False),
+])
+def test_modification_dates(seconds, current):
+    assert _client_is_current(request(if_modified_since=formatdate(seconds, usegmt=True)), HEADERS) is current
+
+
+def test_entity_tags_take_precedence_over_modification_dates():
+    since = formatdate(1300000001, usegmt=True)
+    assert not _client_is_current(request(if_none_match='"old"', if_modified_since=since), HEADERS)
+
+
+def test_unparseable_modification_date():
+    assert not _client_is_current(request(if_modified_since='yesterday'), HEADERS)
+    assert not _client_is_current(request(), HEADERS)
+
+
+def test_only_reads_are_answered_with_304():
+    assert not_modified(request(if_none_match='"abc"'), HEADERS).status_code == 304
+    assert not_modified(request('HEAD', if_none_match='"abc"'), HEADERS).status_code == 304
+    assert not_modified(request('POST', if_none_match='"abc"'), HEADERS) is None
+    assert not_modified(request(if_none_match='"old"'), HEADERS) is None
+
+
+def current_label(granularity):
+    today = pd.Timestamp.today()
+    return {
+        'monthly': today.strftime('%Y-%m'),
+        'quarterly': f"{today.year}-Q{today.quarter}",
+        'halfyearly': f"{today.year}-H{1 if today.month <= 6 else 2}",
+        'annual': str(today.year),
+    }[granularity]
+
+
+@pytest.mark.parametrize('parameter, granularity', list(conditional.PERIOD_PARAMETERS.items()))
+def test_closed_periods_are_immutable(parameter, granularity):
+    assert _cache_control({parameter: current_label(granularity)}) == OPEN
+    closed = {'monthly': '2011-05', 'quarterly': '2011-Q2', 'halfyearly': '2011-H1', 'annual': '2011'}[granularity]
+    assert _cache_control({parameter: closed, 'store': None}) == CLOSED
+
+
+def test_ranges_and_granularity_routes():
+    yesterday = (pd.Timestamp.today() - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    today = pd.Timestamp.today().strftime('%Y-%m-%d')
+    assert _cache_control({'start': '2011-01-01', 'end': yesterday}) == CLOSED
+    assert _cache_control({'start': '2011-01-01', 'end': today}) == OPEN
+    assert _cache_control({'period': '2011-Q2', 'granularity': 'quarterly'}) == CLOSED
+    assert _cache_control({'start': '2011-01', 'end': current_label('monthly'), 'granularity': 'monthly'}) == OPEN
+
+
+def test_requests_whose_period_cannot_be_told_are_open():
+    assert _cache_control({}) == OPEN
+    assert _cache_control({'store': 'A'}) == OPEN
+    assert _cache_control({'period': '2011-Q2', 'granularity': 'monthly'}) == OPEN
+    assert _cache_control({'selected_month': '2011-13'}) == OPEN
+
+
+def test_validators_change_with_the_data_version_only(monkeypatch):
+    monkeypatch.setattr(conditional, '_first_seen', {})
+    key, kwargs = ('monthly', 'total_sales', (('selected_month', '2011-05'),)), {'selected_month': '2011-05'}
+    first = conditional.validators(key, 'A', (10, 10, 0), kwargs)
+    other = conditional.validators(key, 'B', (5, 20, 0), kwargs)
+    assert conditional.validators(key, 'A', (10, 10, 0), kwargs) == first
+    assert first['Cache-Control'] == CLOSED
+
+    monkeypatch.setattr(conditional.time, 'time', lambda: 2000000000)
+    changed = conditional.validators(key, 'A', (11, 11, 0), kwargs)
+    assert changed['ETag'] != first['ETag']
+    assert changed['Last-Modified'] == formatdate(2000000000, usegmt=True)
+    assert conditional.validators(key, 'A', (11, 11, 0), kwargs) == changed
+    # Other partitions keep their own modification date
+    assert conditional.validators(key, 'B', (5, 20, 0), kwargs) == other
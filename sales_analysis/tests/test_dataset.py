@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dataset import (
+    SALES_COLUMNS,
+    QUANTITY_COLUMNS,
+    INDEX_COLUMNS,
+    DailyAccumulator,
+    PrefixIndex,
+    _batch_arrays,
+    _fold_daily,
+)
+
+
+def make_rows(dates, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({'Date': pd.to_datetime(dates)})
+    for column in SALES_COLUMNS + QUANTITY_COLUMNS:
+        frame[column] = rng.integers(0, 100, len(frame)).astype(float)
+    return frame
+
+
+# Reference daily totals: plain groupby over every row, on a contiguous calendar
+def expected_daily(rows):
+    days = rows['Date'].dt.normalize()
+    daily = rows.groupby(days)[SALES_COLUMNS + QUANTITY_COLUMNS].sum()
+    daily['Rows'] = days.value_counts()
+    daily = daily.reindex(pd.date_range(daily.index.min(), daily.index.max()), fill_value=0)
+    return daily[INDEX_COLUMNS].astype(float)
+
+
+def test_accumulator_folds_batches_out_of_order():
+    rows = make_rows(['2011-03-10', '2011-03-12', '2011-03-01', '2011-03-31', '2011-02-27', '2011-03-12', '2011-04-02'])
+    accumulator = DailyAccumulator()
+    # Each batch extends the calendar backwards, forwards or not at all
+    for batch in [rows.iloc[0:2], rows.iloc[2:4], rows.iloc[4:6], rows.iloc[6:]]:
+        days, values, _ = _batch_arrays(batch)
+        accumulator.add(days, values)
+
+    daily = accumulator.frame()
+    assert daily.index[0] == pd.Timestamp('2011-02-27')
+    assert daily.index[-1] == pd.Timestamp('2011-04-02')
+    pd.testing.assert_frame_equal(daily.astype(float), expected_daily(rows), check_names=False, check_freq=False, check_index_type=False)
+
+
+def test_accumulator_counts_missing_values_as_zero():
+    rows = make_rows(['2011-03-01', '2011-03-01'])
+    rows.loc[0, 'S-P1'] = np.nan
+    days, values, _ = _batch_arrays(rows)
+    accumulator = DailyAccumulator()
+    accumulator.add(days, values)
+    daily = accumulator.frame()
+    assert daily.loc['2011-03-01', 'S-P1'] == rows.loc[1, 'S-P1']
+    assert daily.loc['2011-03-01', 'Rows'] == 2
+
+
+def test_empty_accumulator_frame():
+    daily = DailyAccumulator().frame()
+    assert daily.empty
+    assert list(daily.columns) == INDEX_COLUMNS
+
+
+def direct_sums(rows, start_date, end_date):
+    selected = rows[(rows['Date'] >= start_date) & (rows['Date'] < pd.Timestamp(end_date) + pd.Timedelta(days=1))]
+    sums = selected[SALES_COLUMNS + QUANTITY_COLUMNS].sum()
+    sums['Rows'] = len(selected)
+    return sums[INDEX_COLUMNS].astype(float)
+
+
+@pytest.mark.parametrize('start_date, end_date', [
+    ('2011-01-01', '2011-01-31'),
+    ('2011-01-15', '2011-01-15'),
+    ('2010-12-01', '2011-01-03'),  # starts before the first indexed day
+    ('2011-02-20', '2011-05-01'),  # ends after the last indexed day
+    ('2012-01-01', '2012-01-31'),  # entirely after the data
+])
+def test_prefix_index_range_sums(start_date, end_date):
+    rows = make_rows(list(pd.date_range('2011-01-01', '2011-02-28', freq='12h')))
+    index = PrefixIndex.from_daily(expected_daily(rows))
+    np.testing.assert_allclose(index.range_sums(start_date, end_date), direct_sums(rows, start_date, end_date))
+
+
+def test_prefix_index_extended_with_rows_on_the_last_indexed_day():
+    rows = make_rows(list(pd.date_range('2011-01-01', '2011-01-31')))
+    # One more row on the last indexed day, one after a gap of several days
+    added = make_rows(['2011-01-31', '2011-02-05'], seed=1)
+    index = PrefixIndex.from_daily(expected_daily(rows)).extended(_fold_daily([added]))
+
+    everything = pd.concat([rows, added], ignore_index=True)
+    for start_date, end_date in [('2011-01-31', '2011-01-31'), ('2011-01-01', '2011-02-28'), ('2011-02-01', '2011-02-04')]:
+        np.testing.assert_allclose(index.range_sums(start_date, end_date), direct_sums(everything, start_date, end_date))
+
+
+def test_prefix_index_extension_rejects_rows_before_the_last_indexed_day():
+    index = PrefixIndex.from_daily(expected_daily(make_rows(list(pd.date_range('2011-01-01', '2011-01-31')))))
+    assert index.extended(_fold_daily([make_rows(['2011-01-30'])])) is None
+
+
+def test_prefix_index_extension_edge_cases():
+    index = PrefixIndex.from_daily(expected_daily(make_rows(['2011-01-01'])))
+    assert index.extended(_fold_daily([])) is index
+
+    added = make_rows(['2011-01-05'])
+    extended = PrefixIndex.from_daily(DailyAccumulator().frame()).extended(_fold_daily([added]))
+    np.testing.assert_allclose(extended.range_sums('2011-01-01', '2011-01-31'), direct_sums(added, '2011-01-01', '2011-01-31'))
+
+
+@pytest.mark.parametrize('store', [None, 'A'])
+def test_rows_added_while_the_index_is_built_are_counted_once(sqlite_sales, use_source, store):
+    import dataset
+    import metrics
+    sqlite_sales.append([(f'{day:02d}-01-2011', 'A', 10) for day in range(1, 11)])
+    use_source(sqlite_sales.source(append_after_first_probe=[('10-01-2011', 'A', 5)]))
+
+    # The index is built for the version probed before the row was added ...
+    assert dataset.range_sums('2011-01-01', '2011-01-31', store)['S-P1'] == 100
+    # ... and the next version extends it by that row exactly once
+    extensions = metrics.snapshot()['counters'].get('prefix_index.extensions', 0)
+    assert dataset.range_sums('2011-01-01', '2011-01-31', store)['S-P1'] == 105
+    assert metrics.snapshot()['counters']['prefix_index.extensions'] == extensions + 1
+    assert dataset.range_sums('2011-01-01', '2011-01-31', store)['S-P1'] == 105
+    assert dataset.range_sums('2011-01-10', '2011-01-10', store)['Rows'] == 2
+
+
+# Process pool stand-in running the aggregations in-process
+class InlinePool:
+    def map(self, fn, *iterables):
+        return [fn(*arguments) for arguments in zip(*iterables)]
+
+
+def test_background_aggregations_use_their_own_capped_pool(sqlite_sales, use_source, monkeypatch):
+    import dataset
+    sqlite_sales.append([('01-01-2011', 'A', 10), ('02-01-2011', 'B', 20), ('03-01-2011', 'C', 30)])
+    use_source(sqlite_sales.source())
+    monkeypatch.setattr(dataset, 'PARTITION_WORKERS', 4)
+    pools = []
+    monkeypatch.setattr(dataset, '_process_pool', lambda workers, nice: pools.append((workers, nice)) or InlinePool())
+
+    with dataset.background_work(2, 10):
+        started = dataset.background_cpu_seconds()
+        background = dataset.merge_daily(dataset._aggregate_partitions(['A', 'B', 'C'], [None] * 3))
+        assert dataset.background_cpu_seconds() > started
+    live = dataset.merge_daily(dataset._aggregate_partitions(['A', 'B', 'C'], [None] * 3))
+
+    assert pools == [(2, 10), (4, 0)]
+    assert background['S-P1'].sum() == live['S-P1'].sum() == 60
+
+    # Never more background processes than the live pool has
+    with dataset.background_work(8, 10):
+        dataset._aggregate_partitions(['A', 'B'], [None] * 2)
+    assert pools[-1] == (4, 10)
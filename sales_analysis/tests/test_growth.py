@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from dataset import SALES_COLUMNS, parse_period
+from growth import aggregate_period_sales, compute_growth, sales_growth
+
+
+def daily_rows(amounts):
+    frame = pd.DataFrame({'Date': pd.to_datetime(list(amounts))})
+    for column in SALES_COLUMNS:
+        frame[column] = [float(amount) for amount in amounts.values()]
+    return frame
+
+
+def test_periods_are_summed_in_one_pass_and_empty_periods_stay_missing():
+    rows = daily_rows({'2011-01-05': 1, '2011-01-20': 2, '2011-03-01': 4, '2011-04-30': 8})
+    first, last = parse_period('2010-12', 'monthly'), parse_period('2011-04', 'monthly')
+    period_sales = aggregate_period_sales(rows, 'monthly', first, last)
+
+    assert period_sales.index.tolist() == list(range(first, last + 1))
+    np.testing.assert_array_equal(period_sales['S-P1'].to_numpy(), [np.nan, 3, np.nan, 4, 8])
+    np.testing.assert_array_equal(period_sales['Total'].to_numpy(), [np.nan, 12, np.nan, 16, 32])
+
+
+def test_quarters_and_years_group_by_their_own_ordinals():
+    rows = daily_rows({'2010-12-31': 1, '2011-01-01': 2, '2011-06-30': 4, '2011-07-01': 8})
+    quarterly = aggregate_period_sales(rows, 'quarterly', parse_period('2010-Q4', 'quarterly'), parse_period('2011-Q3', 'quarterly'))
+    np.testing.assert_array_equal(quarterly['S-P1'].to_numpy(), [1, 2, 4, 8])
+    annual = aggregate_period_sales(rows, 'annual', parse_period('2010', 'annual'), parse_period('2011', 'annual'))
+    np.testing.assert_array_equal(annual['S-P1'].to_numpy(), [1, 14])
+
+
+def test_growth_against_the_previous_period():
+    period_sales = pd.DataFrame({'Total': [100.0, 150.0, np.nan, 120.0, 0.0, 30.0]})
+    baseline, change, percentage_change = compute_growth(period_sales, 1)
+
+    np.testing.assert_array_equal(baseline['Total'].to_numpy(), [np.nan, 100, 150, np.nan, 120, 0])
+    np.testing.assert_array_equal(change['Total'].to_numpy(), [np.nan, 50, np.nan, np.nan, -120, 30])
+    # A zero baseline has no percentage change
+    np.testing.assert_array_equal(percentage_change['Total'].to_numpy(), [np.nan, 50, np.nan, np.nan, -100, np.nan])
+
+
+def test_growth_against_the_same_period_a_year_earlier():
+    period_sales = pd.DataFrame({'Total': [10.0, 20.0, 30.0, 40.0, 20.0, 20.0]})
+    baseline, change, percentage_change = compute_growth(period_sales, 4)
+    np.testing.assert_array_equal(change['Total'].to_numpy(), [np.nan] * 4 + [10, 0])
+    np.testing.assert_array_equal(percentage_change['Total'].to_numpy(), [np.nan] * 4 + [100, 0])
+
+
+def test_growth_endpoint_reports_baselines_before_the_range(sqlite_sales, use_source):
+    sqlite_sales.append([('15-12-2010', 'A', 50), ('10-01-2011', 'A', 100), ('10-03-2011', 'A', 80)])
+    use_source(sqlite_sales.source())
+
+    result = sales_growth(start='2011-01', end='2011-03', granularity='monthly', compare='previous', store=None)
+
+    assert result['periods'] == ['2011-01', '2011-02', '2011-03']
+    assert result['baseline_periods'] == ['2010-12', '2011-01', '2011-02']
+    growth = result['growth']['S-P1']
+    assert growth['sales'] == [100, None, 80]
+    assert growth['baseline'] == [50, 100, None]
+    assert growth['change'] == [50, None, None]
+    assert growth['percentage_change'] == [100, None, None]
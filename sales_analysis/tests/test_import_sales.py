@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from import_sales import coerce_chunk, VALUE_COLUMNS
+from sources import PARTITION_FIELD, DATE_VALUE_FIELD, DATE_FORMAT
+
+
+def make_chunk(dates, **columns):
+    chunk = pd.DataFrame({'Date': dates, **{column: ['1'] * len(dates) for column in VALUE_COLUMNS}})
+    for name, values in columns.items():
+        chunk[name] = values
+    return chunk
+
+
+def test_dates_are_parsed_in_every_accepted_format():
+    documents, rejected = coerce_chunk(make_chunk(['05-03-2011', '2011-03-06', '07/03/2011']))
+    assert rejected.empty
+    assert documents['Date'].tolist() == ['05-03-2011', '06-03-2011', '07-03-2011']
+    assert documents[DATE_VALUE_FIELD].tolist() == list(pd.to_datetime(['2011-03-05', '2011-03-06', '2011-03-07']))
+
+
+def test_invalid_rows_are_rejected_with_a_reason():
+    chunk = make_chunk(['31-02-2011', '01-03-2011', '', '02-03-2011'])
+    chunk.loc[1, 'S-P2'] = 'x'
+    documents, rejected = coerce_chunk(chunk)
+    assert documents['Date'].tolist() == ['02-03-2011']
+    assert rejected['reason'].tolist() == ['invalid Date', 'invalid S-P2', 'invalid Date']
+
+
+def test_values_are_numeric():
+    documents, _ = coerce_chunk(make_chunk(['01-03-2011'], **{'S-P1': ['12.5']}))
+    assert documents.loc[0, 'S-P1'] == 12.5
+    assert documents[VALUE_COLUMNS].dtypes.eq(float).all()
+
+
+def test_blank_stores_belong_to_the_default_partition():
+    chunk = make_chunk(['01-03-2011'] * 5, **{PARTITION_FIELD: ['', ' A ', None, float('nan'), 3.0]})
+    documents, _ = coerce_chunk(chunk)
+    stores = documents[PARTITION_FIELD]
+    # Blank stores are left null, which write_batch stores without a Store field
+    assert stores.isna().tolist() == [True, False, True, True, False]
+    assert stores.dropna().tolist() == ['A', '3']
+
+
+def test_store_argument_overrides_the_column():
+    chunk = make_chunk(['01-03-2011'], **{PARTITION_FIELD: ['A']})
+    documents, _ = coerce_chunk(chunk, store='B')
+    assert documents[PARTITION_FIELD].tolist() == ['B']
+
+
+def test_missing_required_columns():
+    with pytest.raises(SystemExit):
+        coerce_chunk(pd.DataFrame({'Date': ['01-03-2011'], 'S-P1': ['1']}))
+
+
+# Collection recording the backfill's queries; documents without DATE_VALUE_FIELD are
+# returned by find() until update_many() has been called for them
+class BackfillCollection:
+    def __init__(self, missing):
+        self.missing = list(missing)
+        self.updates = []
+        self.indexes = []
+
+    def create_index(self, keys):
+        self.indexes.append(keys)
+
+    def find(self, query, projection):
+        assert query == {DATE_VALUE_FIELD: {'$exists': False}}
+        collection = self
+
+        class Cursor:
+            def limit(self, count):
+                return [{'_id': _id} for _id in collection.missing[:count]]
+        return Cursor()
+
+    def update_many(self, query, update):
+        self.updates.append((query, update))
+        ids = query['_id']['$in']
+        self.missing = [_id for _id in self.missing if _id not in ids]
+        return SimpleNamespace(modified_count=len(ids))
+
+
+def test_backfill_parses_the_date_text_of_documents_without_the_date_field(monkeypatch):
+    import import_sales
+    documents = BackfillCollection(range(5))
+    monkeypatch.setattr(import_sales, 'collection', documents)
+
+    totals = import_sales.backfill_date_field(batch_size=2)
+
+    assert totals['updated'] == 5
+    assert [query['_id']['$in'] for query, _ in documents.updates] == [[0, 1], [2, 3], [4]]
+    parsed = documents.updates[0][1][0]['$set'][DATE_VALUE_FIELD]['$dateFromString']
+    assert parsed['dateString'] == '$Date' and parsed['format'] == DATE_FORMAT
+    assert DATE_VALUE_FIELD in documents.indexes
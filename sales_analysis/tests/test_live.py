@@ -0,0 +1,71 @@
+import asyncio
+import json
+import sqlite3
+import pytest
+
+JANUARY = [(f'{day:02d}-01-2011', 'A', 10) for day in range(1, 11)]
+
+
+# Totals a subscriber holds after applying every queued event to the snapshot
+def apply_events(totals, queue):
+    while not queue.empty():
+        event = queue.get_nowait()
+        data = json.loads(event.split('data: ', 1)[1])
+        if 'totals' in data:
+            totals = dict(data['totals'])
+        else:
+            for column, change in data['changes'].items():
+                totals[column] += change
+    return totals
+
+
+def direct_total(sales, store=None):
+    query = "SELECT TOTAL(\"S-P1\") FROM Sales_data WHERE substr(Date, 4, 7) = '01-2011'"
+    if store is not None:
+        query += f" AND Store = '{store}'"
+    with sqlite3.connect(sales.path) as connection:
+        return connection.execute(query).fetchone()[0]
+
+
+# Wait until the watcher has pushed the totals of the data version now in the source
+async def settle(live, dataset, store):
+    for _ in range(500):
+        if live._versions.get(store) == dataset.source.version(store):
+            # One more poll so an update already under way has finished
+            await asyncio.sleep(live.LIVE_POLL_INTERVAL * 3)
+            return
+        await asyncio.sleep(live.LIVE_POLL_INTERVAL)
+    raise AssertionError("live totals never caught up with the data")
+
+
+@pytest.mark.parametrize('store', [None, 'A'])
+def test_pushed_totals_follow_appended_rows(sqlite_sales, use_source, monkeypatch, store):
+    import dataset
+    import live
+    monkeypatch.setattr(live, 'LIVE_POLL_INTERVAL', 0.01)
+    sqlite_sales.append(JANUARY)
+    # A row arrives while the topic's first totals are being read
+    use_source(sqlite_sales.source(append_after_first_probe=[('10-01-2011', 'A', 5)]))
+    monkeypatch.setattr(dataset, 'DATA_VERSION_TTL', 0.05)
+
+    async def subscribe_and_append():
+        topic, queue = await live._subscribe('monthly', '2011-01', store)
+        try:
+            # The snapshot a client receives on connect
+            totals = dict(topic.totals)
+            await settle(live, dataset, store)
+            totals = apply_events(totals, queue)
+            first = totals['S-P1']
+
+            # Rows on the last day with data, on a later day and in another store
+            sqlite_sales.append([('10-01-2011', 'A', 7), ('20-01-2011', 'A', 3), ('21-01-2011', 'B', 100)])
+            await settle(live, dataset, store)
+            totals = apply_events(totals, queue)
+            return first, totals['S-P1']
+        finally:
+            live._unsubscribe(topic, queue)
+            await live._watcher
+
+    first, second = asyncio.run(subscribe_and_append())
+    assert first == 105
+    assert second == direct_total(sqlite_sales, store)
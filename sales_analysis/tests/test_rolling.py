@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from rolling import rolling_metrics, rolling_sales
+
+
+def daily_frame(start, end, seed=0):
+    index = pd.date_range(start, end, name='Date')
+    values = np.random.default_rng(seed).integers(0, 100, len(index)).astype(float)
+    return pd.DataFrame({'S-P1': values}, index=index)
+
+
+def test_rolling_windows_match_direct_window_sums():
+    daily = daily_frame('2011-01-01', '2011-03-31')
+    metrics = rolling_metrics(daily, [1, 7, 30], daily.index[0])
+    for window in [1, 7, 30]:
+        # Incomplete windows at the first recorded days are missing, as with min_periods=window
+        expected = daily['S-P1'].rolling(window).sum()
+        np.testing.assert_allclose(metrics[f"rolling_sum_{window}"]['S-P1'], expected)
+        np.testing.assert_allclose(metrics[f"rolling_mean_{window}"]['S-P1'], expected / window)
+
+
+def test_year_to_date_restarts_every_january():
+    daily = daily_frame('2010-11-01', '2011-02-28')
+    ytd = rolling_metrics(daily, [7], daily.index[0])['ytd']['S-P1']
+    # The first recorded year is incomplete
+    assert ytd.loc[:'2010-12-31'].isna().all()
+    values = daily['S-P1']
+    assert ytd.loc['2011-01-01'] == values.loc['2011-01-01']
+    assert ytd.loc['2011-02-15'] == values.loc['2011-01-01':'2011-02-15'].sum()
+
+
+def test_trailing_twelve_months_cover_the_year_up_to_each_day():
+    daily = daily_frame('2010-01-01', '2011-06-30')
+    ttm = rolling_metrics(daily, [7], daily.index[0])['ttm']['S-P1']
+    values = daily['S-P1']
+    assert ttm.loc[:'2010-12-30'].isna().all()
+    # The first complete twelve months end on the last day of the first recorded year
+    assert ttm.loc['2010-12-31'] == values.loc['2010-01-01':'2010-12-31'].sum()
+    assert ttm.loc['2011-01-01'] == values.loc['2010-01-02':'2011-01-01'].sum()
+    # From the same day one year earlier, exclusive
+    assert ttm.loc['2011-06-30'] == values.loc['2010-07-01':'2011-06-30'].sum()
+
+
+def test_cumulative_total_starts_at_the_range():
+    daily = daily_frame('2011-01-01', '2011-01-31')
+    cumulative = rolling_metrics(daily, [7], pd.Timestamp('2011-01-10'))['cumulative']['S-P1']
+    assert cumulative.loc[:'2011-01-09'].isna().all()
+    np.testing.assert_allclose(cumulative.loc['2011-01-10':], daily['S-P1'].loc['2011-01-10':].cumsum())
+
+
+@pytest.fixture
+def year_of_sales(sqlite_sales, use_source):
+    # 10 a day through 2010 and 2011
+    sqlite_sales.append([(date.strftime('%d-%m-%Y'), 'A', 10) for date in pd.date_range('2010-01-01', '2011-12-31')])
+    use_source(sqlite_sales.source())
+
+
+def rolling(**parameters):
+    parameters = {'granularity': 'daily', 'windows': '7', 'measure': 'sales', 'store': None, **parameters}
+    return rolling_sales(**parameters)['metrics']['S-P1']
+
+
+def test_windows_are_complete_at_the_left_edge_of_the_range(year_of_sales):
+    metrics = rolling(start='2011-03-01', end='2011-03-03', windows='7,90')
+    assert metrics['rolling_sum_7'] == [70, 70, 70]
+    assert metrics['rolling_sum_90'] == [900, 900, 900]
+    assert metrics['ttm'] == [3650, 3650, 3650]
+    assert metrics['ytd'] == [600, 610, 620]
+    assert metrics['cumulative'] == [10, 20, 30]
+
+
+def test_windows_before_the_first_recorded_day_are_null(year_of_sales):
+    metrics = rolling(start='2010-01-01', end='2010-01-08')
+    assert metrics['rolling_sum_7'] == [None] * 6 + [70, 70]
+    assert metrics['ttm'] == [None] * 8
+
+
+def test_metrics_at_period_ends(year_of_sales):
+    result = rolling_sales(start='2011-01-01', end='2011-06-30', granularity='quarterly', windows='7',
+                           measure='sales', store=None)
+    assert result['periods'] == ['2011-Q1', '2011-Q2']
+    assert result['metrics']['S-P1']['ytd'] == [900, 1810]
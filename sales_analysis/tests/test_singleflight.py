@@ -0,0 +1,158 @@
+import contextlib
+import threading
+import pytest
+from admission import AdmissionGate, GateBusy, limited
+from singleflight import SingleFlight, coalesce
+
+
+def run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight('test')
+    leader_started = threading.Event()
+    release = threading.Event()
+    waiting = []
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        leader_started.set()
+        release.wait(5)
+        return 'result'
+
+    @contextlib.contextmanager
+    def record_wait():
+        waiting.append(1)
+        yield
+
+    def call():
+        results.append(flights.do('key', work, waiting=record_wait))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    leader_started.wait(5)
+    followers = run_concurrently(4, call)
+    while len(waiting) < 4:
+        pass
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ['result'] * 5
+    assert flights._calls == {}
+
+
+def test_followers_get_the_leaders_exception_and_enter_waiting():
+    flights = SingleFlight('test')
+    leader_started = threading.Event()
+    release = threading.Event()
+    waiting = []
+    errors = []
+
+    def work():
+        leader_started.set()
+        release.wait(5)
+        raise ValueError('boom')
+
+    @contextlib.contextmanager
+    def record_wait():
+        waiting.append(1)
+        yield
+
+    def call():
+        try:
+            flights.do('key', work, waiting=record_wait)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    leader_started.wait(5)
+    followers = run_concurrently(3, call)
+    while len(waiting) < 3:
+        pass
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert errors == ['boom'] * 4
+    # Only the blocked callers enter the waiting context, never the leader
+    assert len(waiting) == 3
+
+
+def test_follower_times_out():
+    flights = SingleFlight('test')
+    leader_started = threading.Event()
+    release = threading.Event()
+
+    def work():
+        leader_started.set()
+        release.wait(5)
+
+    leader = threading.Thread(target=lambda: flights.do('key', work))
+    leader.start()
+    leader_started.wait(5)
+    with pytest.raises(TimeoutError):
+        flights.do('key', work, timeout=0.05)
+    release.set()
+    leader.join()
+
+
+def test_different_keys_run_independently():
+    flights = SingleFlight('test')
+    assert flights.do('a', lambda: 1) == 1
+    assert flights.do('b', lambda x: x * 2, 21) == 42
+
+
+# Gate whose background calls are refused only once `proceed` is set, so a live call
+# can start waiting for the background run first
+class SlowToRefuse(AdmissionGate):
+    def __init__(self):
+        super().__init__('slow', 1, 4)
+        self.refusing = threading.Event()
+        self.proceed = threading.Event()
+
+    def slot(self, timeout=5, background=False):
+        if background:
+            self.refusing.set()
+            self.proceed.wait(5)
+            raise GateBusy("No spare capacity")
+        return super().slot(timeout)
+
+
+def test_live_call_runs_itself_when_the_background_run_it_waited_for_gives_up():
+    gate = SlowToRefuse()
+
+    def endpoint(month):
+        return f'totals of {month}'
+
+    live = coalesce(limited(endpoint, gate), gate)
+    warming = coalesce(limited(endpoint, gate, background=True), background=True)
+    outcomes = {}
+
+    def warm():
+        try:
+            warming(month='2011-05')
+        except GateBusy:
+            outcomes['warming'] = 'busy'
+
+    warmer = threading.Thread(target=warm)
+    warmer.start()
+    gate.refusing.wait(5)
+    caller = threading.Thread(target=lambda: outcomes.update(live=live(month='2011-05')))
+    caller.start()
+    # The live call is queued behind the background run
+    while gate._waiting < 1:
+        pass
+    gate.proceed.set()
+    warmer.join()
+    caller.join()
+
+    assert outcomes == {'warming': 'busy', 'live': 'totals of 2011-05'}
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sources import DEFAULT_PARTITION, PARTITION_FIELD, partition_key, partition_values, filter_frame
+
+
+@pytest.mark.parametrize('value, key', [
+    ('A', 'A'),
+    (' A ', 'A'),
+    (3, '3'),
+    (3.0, '3'),
+    (np.int64(3), '3'),
+    (2.5, '2.5'),
+    ('3.0', '3.0'),
+    (None, None),
+    (float('nan'), None),
+    ('', None),
+    ('  ', None),
+])
+def test_partition_key(value, key):
+    assert partition_key(value) == key
+
+
+def test_partition_values():
+    assert partition_values('A') == ['A']
+    assert partition_values('3') == ['3', 3]
+    # A stored '3.0' is its own partition and must not also match the number 3
+    assert partition_values('3.0') == ['3.0']
+    assert partition_values(DEFAULT_PARTITION) == [DEFAULT_PARTITION, None, '']
+
+
+def test_filter_frame_matches_partition_keys():
+    frame = pd.DataFrame({
+        'Date': pd.to_datetime(['2011-03-01', '2011-03-02', '2011-03-03', '2011-03-04', '2011-04-01']),
+        PARTITION_FIELD: [3.0, '3', None, '', '3'],
+    })
+    assert filter_frame(frame, store='3').index.tolist() == [0, 1, 4]
+    assert filter_frame(frame, store=DEFAULT_PARTITION).index.tolist() == [2, 3]
+    assert filter_frame(frame, '2011-03-02', '2011-03-31', '3').index.tolist() == [1]
+
+
+@pytest.mark.parametrize('backend', ['csv', 'parquet', 'sqlite'])
+def test_callable_batch_size_is_read_before_every_batch(sales_files, backend):
+    source = sales_files([(f'{day:02d}-01-2011', 'A', day) for day in range(1, 13)])[backend]
+    sizes = iter([5, 1])
+    sizing = {'batch_size': 2}
+    lengths = []
+    for frame in source.batches(['S-P1'], batch_size=lambda: sizing['batch_size']):
+        lengths.append(len(frame))
+        sizing['batch_size'] = next(sizes, 100)
+    assert lengths == [2, 5, 1, 4]
+
+
+BACKENDS = ['csv', 'parquet', 'sqlite']
+ROWS = [('01-03-2011', 'A', 1), ('15-03-2011', 'B', 2), ('31-03-2011', '3', 4), ('01-04-2011', 'A', 8), ('02-04-2011', '', 16)]
+
+
+def collect(batches):
+    frames = list(batches)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_batches_filter_date_ranges_inclusively(sales_files, backend):
+    source = sales_files(ROWS)[backend]
+    frame = collect(source.batches(['S-P1'], '2011-03-15', '2011-03-31', batch_size=2))
+    assert frame.columns.tolist() == ['Date', 'S-P1']
+    assert frame['Date'].tolist() == [pd.Timestamp('2011-03-15'), pd.Timestamp('2011-03-31')]
+    assert frame['S-P1'].tolist() == [2, 4]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_batches_filter_partitions(sales_files, backend):
+    source = sales_files(ROWS)[backend]
+    assert collect(source.batches(['S-P1'], store='A'))['S-P1'].tolist() == [1, 8]
+    assert collect(source.batches(['S-P1'], store='3'))['S-P1'].tolist() == [4]
+    # Rows without a store belong to the default partition
+    assert collect(source.batches(['S-P1'], store=DEFAULT_PARTITION))['S-P1'].tolist() == [16]
+    assert collect(source.batches(['S-P1'], store='C')).empty
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_partitions(sales_files, backend):
+    assert sales_files(ROWS)[backend].partitions() == sorted(['3', 'A', 'B', DEFAULT_PARTITION])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_rows_with_invalid_dates_are_dropped(sales_files, backend):
+    source = sales_files([('01-03-2011', 'A', 1), ('31-02-2011', 'A', 2), ('2011-03-02', 'A', 4)])[backend]
+    assert collect(source.batches(['S-P1', 'Q-P1']))['S-P1'].tolist() == [1]
+
+
+def test_sqlite_numeric_stores_match_their_text_key(sqlite_sales):
+    sqlite_sales.append([('01-03-2011', 3, 1), ('02-03-2011', '3', 2), ('03-03-2011', None, 4)])
+    source = sqlite_sales.source()
+    assert collect(source.batches(['S-P1'], store='3'))['S-P1'].tolist() == [1, 2]
+    assert collect(source.batches(['S-P1'], store=DEFAULT_PARTITION))['S-P1'].tolist() == [4]
+    assert source.partitions() == ['3', DEFAULT_PARTITION]
+
+
+@pytest.mark.parametrize('backend', ['csv', 'parquet'])
+def test_file_versions_change_when_the_file_does(sales_files, backend):
+    source = sales_files(ROWS)[backend]
+    version = source.version()
+    assert source.version('A') == version
+    sales_files(ROWS + [('03-04-2011', 'A', 32)])
+    assert source.version() != version
+    # A file can be rewritten anywhere, so it never extends
+    assert source.added_since(version, source.version(), ['S-P1']) is None
+
+
+def test_sqlite_version_follows_appends_and_writes(sqlite_sales):
+    sqlite_sales.append(ROWS)
+    source = sqlite_sales.source()
+    assert source.version() == (5, 5, 0)
+    assert source.version('A') == (2, 4, 0)
+    sqlite_sales.append([('03-04-2011', 'B', 32)])
+    assert source.version() == (6, 6, 0)
+    # Other partitions are unchanged
+    assert source.version('A') == (2, 4, 0)
+    source.mark_written(['A'])
+    assert source.version() == (6, 6, 1)
+    assert source.version('A') == (2, 4, 1)
+    assert source.version('B') == (2, 6, 0)
+
+
+@pytest.mark.parametrize('store, added', [(None, [32, 64]), ('B', [32]), ('A', [])])
+def test_sqlite_added_since_reads_exactly_the_appended_rows(sqlite_sales, store, added):
+    sqlite_sales.append(ROWS)
+    source = sqlite_sales.source()
+    previous = source.version(store)
+    sqlite_sales.append([('03-04-2011', 'B', 32), ('04-04-2011', '', 64)])
+    version = source.version(store)
+    # Rows appended after the version was probed are left for the next extension
+    sqlite_sales.append([('05-04-2011', 'B', 128)])
+    frame = collect(source.added_since(previous, version, ['S-P1'], store, batch_size=1))
+    assert frame.get('S-P1', pd.Series(dtype=float)).tolist() == added
+
+
+def test_sqlite_added_since_gives_up_after_writes_in_place(sqlite_sales):
+    sqlite_sales.append(ROWS)
+    source = sqlite_sales.source()
+    previous = source.version()
+    source.mark_written(['A'])
+    sqlite_sales.append([('03-04-2011', 'B', 32)])
+    assert source.added_since(previous, source.version(), ['S-P1']) is None
+
+
+def test_sqlite_added_since_gives_up_after_deletions(sqlite_sales):
+    import sqlite3
+    sqlite_sales.append(ROWS)
+    source = sqlite_sales.source()
+    previous = source.version()
+    with sqlite3.connect(sqlite_sales.path) as connection:
+        connection.execute('DELETE FROM Sales_data WHERE rowid = 2')
+    sqlite_sales.append([('03-04-2011', 'B', 32)])
+    assert source.added_since(previous, source.version(), ['S-P1']) is None
+
+
+def test_sqlite_batches_until_a_version(sqlite_sales):
+    sqlite_sales.append(ROWS)
+    source = sqlite_sales.source()
+    version = source.version()
+    sqlite_sales.append([('03-04-2011', 'A', 32)])
+    assert collect(source.batches(['S-P1'], until=version))['S-P1'].tolist() == [1, 2, 4, 8, 16]
+    assert collect(source.batches(['S-P1']))['S-P1'].tolist() == [1, 2, 4, 8, 16, 32]
@@ -0,0 +1,143 @@
+import asyncio
+import contextlib
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import metrics
+from admission import GateBusy
+from cache import request_stats
+from conditional import PERIOD_PARAMETERS
+from dataset import (
+    get_data_version,
+    daily_sales,
+    period_ordinals,
+    period_label,
+    background_work,
+    background_cpu_seconds,
+)
+
+WARM_ENABLED = os.environ.get('WARM_ENABLED', '1') == '1'
+# Worker threads used for warming (and worker processes for the partitions warming
+# aggregates), and the share of one core each may use
+WARM_CONCURRENCY = int(os.environ.get('WARM_CONCURRENCY', '2'))
+WARM_CPU_SHARE = float(os.environ.get('WARM_CPU_SHARE', '0.5'))
+# Niceness applied to warming threads and processes so live requests are scheduled first
+WARM_NICE = int(os.environ.get('WARM_NICE', '10'))
+# Most-requested endpoint calls re-warmed after each data change
+WARM_TOP_K = int(os.environ.get('WARM_TOP_K', '20'))
+# Seconds between data version checks
+WARM_POLL_INTERVAL = float(os.environ.get('WARM_POLL_INTERVAL', '30'))
+
+_period_routes = []
+
+
+# Collect every cached route selecting a single period; other parameters keep their defaults
+def register_routes(app):
+    for route in app.routes:
+        endpoint = getattr(route, 'endpoint', None)
+        if not hasattr(endpoint, 'compute'):
+            continue
+        signature = inspect.signature(endpoint).parameters
+        parameters = [name for name in signature if name in PERIOD_PARAMETERS]
+        if len(parameters) == 1:
+            # Same keyword arguments as a request relying on the query defaults
+            defaults = {
+                name: parameter.default.default
+                for name, parameter in signature.items()
+                if name != parameters[0] and name not in ('request', 'response')
+            }
+            _period_routes.append((endpoint, parameters[0], PERIOD_PARAMETERS[parameters[0]], defaults))
+
+
+# Current (latest period with data) and previous period labels
+def latest_periods(granularity):
+    daily = daily_sales()
+    if daily.empty:
+        return []
+    ordinal = period_ordinals(pd.Series([daily.index.max()]), granularity).iloc[0]
+    return [period_label(ordinal, granularity), period_label(ordinal - 1, granularity)]
+
+
+def warm_tasks():
+    tasks = {}
+    for endpoint, parameter, granularity, defaults in _period_routes:
+        for label in latest_periods(granularity):
+            kwargs = {**defaults, parameter: label}
+            tasks[(id(endpoint), tuple(sorted(kwargs.items())))] = (endpoint, kwargs)
+    for endpoint, kwargs in request_stats.top(WARM_TOP_K):
+        tasks.setdefault((id(endpoint), tuple(sorted(kwargs.items()))), (endpoint, kwargs))
+    return list(tasks.values())
+
+
+def _lower_thread_priority():
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WARM_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+# Run `fn` as background work, then idle long enough to keep this thread, together with
+# the aggregation processes it started, under its CPU share
+def _run_throttled(fn, *args, **kwargs):
+    started = time.thread_time() + background_cpu_seconds()
+    try:
+        with background_work(WARM_CONCURRENCY, WARM_NICE):
+            return fn(*args, **kwargs)
+    finally:
+        used = time.thread_time() + background_cpu_seconds() - started
+        time.sleep(used * (1 - WARM_CPU_SHARE) / WARM_CPU_SHARE)
+
+
+# Returns whether the task was skipped for lack of spare admission capacity
+def _run_task(endpoint, kwargs):
+    try:
+        _run_throttled(endpoint.compute, **kwargs)
+        metrics.incr("warmer.tasks")
+    except GateBusy:
+        # Live requests are using the route's capacity
+        metrics.incr("warmer.skipped")
+        return True
+    except Exception:
+        # e.g. a 404 for a period without data
+        metrics.incr("warmer.errors")
+    return False
+
+
+def warm_cycle():
+    started = time.monotonic()
+    with ThreadPoolExecutor(WARM_CONCURRENCY, initializer=_lower_thread_priority) as pool:
+        # Finding the latest periods builds the daily series on a cold start
+        tasks = pool.submit(_run_throttled, warm_tasks).result()
+        skipped = sum(pool.map(lambda task: _run_task(*task), tasks))
+    request_stats.decay()
+    metrics.incr("warmer.cycles")
+    metrics.set_gauge("warmer.last_cycle_seconds", time.monotonic() - started)
+    return skipped
+
+
+# Warm once at startup, then again whenever the data version changes. A cycle that had
+# to skip tasks is repeated on the next poll; the tasks it did warm are cache hits then.
+async def _warm_loop():
+    warmed_version = None
+    while True:
+        try:
+            version = await asyncio.to_thread(get_data_version)
+            if version != warmed_version:
+                if not await asyncio.to_thread(warm_cycle):
+                    warmed_version = version
+        except Exception as e:
+            print(f"Cache warming failed: {str(e)}")
+        await asyncio.sleep(WARM_POLL_INTERVAL)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    task = asyncio.create_task(_warm_loop()) if WARM_ENABLED else None
+    yield
+    if task is not None:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task